@@ -0,0 +1,211 @@
+import os
+import hashlib
+import logging
+import tempfile
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from .models import Blob
+from . import metrics
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Uploaded files are stored once per content hash under this directory
+BLOB_DIR = os.getenv("BLOB_DIR", os.path.join(os.path.dirname(__file__), "uploads", "blobs"))
+BLOB_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(4 * 1024 * 1024)))
+# Unreferenced blobs are only collected after this long
+BLOB_GC_GRACE_SECONDS = int(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))
+
+blobs_written = metrics.counter("blob_store_blobs_written_total", "New blobs written to disk")
+blobs_deduplicated = metrics.counter("blob_store_deduplicated_total", "Uploads that reused an existing blob")
+bytes_deduplicated = metrics.counter("blob_store_deduplicated_bytes_total", "Upload bytes not written because the blob existed")
+blobs_collected = metrics.counter("blob_store_collected_total", "Unreferenced blobs deleted by garbage collection")
+
+
+def blob_path(sha256: str) -> str:
+    """Where a blob lives, fanned out by hash prefix."""
+    return os.path.join(BLOB_DIR, sha256[:2], sha256)
+
+
+def hash_stream(source: BinaryIO) -> tuple[int, str]:
+    """Reads a stream to the end in chunks and rewinds it. Returns (size, sha256)."""
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = source.read(BLOB_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+    source.seek(0)
+    return size, digest.hexdigest()
+
+
+def _add_reference(db: Session, sha256: str, size: int) -> None:
+    statement = insert(Blob).values(
+        sha256=sha256, size=size, ref_count=1, last_referenced_at=datetime.now(timezone.utc),
+    )
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[Blob.sha256],
+        set_={
+            "ref_count": Blob.ref_count + 1,
+            "last_referenced_at": statement.excluded.last_referenced_at,
+        },
+    ))
+
+
+def acquire_reference(db: Session, sha256: str, size: int) -> None:
+    """
+    Takes one reference to a blob, creating its row if needed, and commits at once.
+    Once this returns, garbage collection leaves the blob alone: a sweep that
+    already deleted the row holds its lock until the file is gone, so the upsert
+    waits for it and the caller then finds no file and writes it again. Release the
+    reference with release_reference() if the upload does not go through.
+    """
+    _add_reference(db, sha256, size)
+    db.commit()
+
+
+def write_blob(source: BinaryIO, sha256: str) -> None:
+    """
+    Copies a stream into the blob for sha256. The data goes to a temp file next to
+    the blob and is renamed into place, so a blob file is always complete; two
+    uploads racing on the same content both write the same bytes.
+    """
+    path = blob_path(sha256)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".partial_", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = source.read(BLOB_CHUNK_SIZE)
+                if not chunk:
+                    break
+                out.write(chunk)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    blobs_written.inc()
+
+
+def store_stream(db: Session, source: BinaryIO) -> tuple[int, str, bool]:
+    """
+    Stores an upload stream by content and takes a reference to its blob. The stream
+    is hashed first and only written when the blob's file does not exist yet.
+    Returns (size, sha256, written); the caller must release the reference if the
+    upload is abandoned.
+    """
+    size, sha256 = hash_stream(source)
+    acquire_reference(db, sha256, size)
+    if os.path.exists(blob_path(sha256)):
+        blobs_deduplicated.inc()
+        bytes_deduplicated.inc(size)
+        return size, sha256, False
+    try:
+        write_blob(source, sha256)
+    except Exception:
+        release_reference(db, sha256)
+        db.commit()
+        raise
+    return size, sha256, True
+
+
+def store_file(db: Session, path: str, sha256: str, size: int) -> bool:
+    """
+    Moves a complete file (e.g. an assembled resumable upload) into the blob store
+    unless the blob's file exists already, then commits the caller's transaction
+    together with a reference to the blob. If anything fails, including the commit,
+    the file is back at path, so the caller can roll back and try again.
+    Returns True if a new blob was stored.
+    """
+    # Locks the blob's row until the commit, so garbage collection can't take the file
+    _add_reference(db, sha256, size)
+    destination = blob_path(sha256)
+    if os.path.exists(destination):
+        db.commit()
+        blobs_deduplicated.inc()
+        bytes_deduplicated.inc(size)
+        return False
+
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    moved = True
+    try:
+        os.replace(path, destination)
+    except OSError:
+        # Not on the same filesystem; copy it over instead
+        moved = False
+        with open(path, "rb") as source:
+            write_blob(source, sha256)
+    try:
+        db.commit()
+    except Exception:
+        if moved:
+            os.replace(destination, path)
+        else:
+            os.unlink(destination)
+        raise
+    if moved:
+        blobs_written.inc()
+    return True
+
+
+def release_reference(db: Session, sha256: str) -> None:
+    """
+    Drops one reference in the caller's transaction; the blob is left for
+    collect_garbage() to delete. Blobs are never deleted directly, since another
+    upload of the same content may be using the file.
+    """
+    db.execute(
+        update(Blob)
+        .where(Blob.sha256 == sha256, Blob.ref_count > 0)
+        .values(ref_count=Blob.ref_count - 1, last_referenced_at=datetime.now(timezone.utc))
+    )
+
+
+def collect_garbage(db: Session, grace_seconds: int = BLOB_GC_GRACE_SECONDS) -> dict:
+    """
+    Deletes blobs that have had no references for longer than grace_seconds.
+    Rows an upload is referencing right now are locked and skipped, and the delete
+    re-checks the conditions, so a blob touched during the sweep survives it. The
+    deleted rows stay locked until their files are gone, which makes a concurrent
+    acquire_reference() wait and then write the blob again.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+    unreferenced = (Blob.ref_count <= 0, Blob.last_referenced_at < cutoff)
+    candidates = db.scalars(
+        select(Blob.sha256).where(*unreferenced).with_for_update(skip_locked=True)
+    ).all()
+    if not candidates:
+        db.commit()
+        return {"blobs": 0, "bytes": 0}
+    removed = db.execute(
+        delete(Blob)
+        .where(Blob.sha256.in_(candidates), *unreferenced)
+        .returning(Blob.sha256, Blob.size)
+    ).all()
+
+    freed = 0
+    for sha256, size in removed:
+        try:
+            os.unlink(blob_path(sha256))
+            freed += size
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not delete blob {sha256}: {e}")
+    db.commit()
+    blobs_collected.inc(len(removed))
+    if removed:
+        logger.info(f"Blob garbage collection removed {len(removed)} blob(s), {freed} bytes")
+    return {"blobs": len(removed), "bytes": freed}
@@ -47,6 +47,35 @@ def ensure_uploaded_files_schema() -> None:
             conn.execute(text(
                 "ALTER TABLE uploaded_files ADD COLUMN IF NOT EXISTS dp_id INTEGER"
             ))
+            conn.execute(text(
+                "ALTER TABLE uploaded_files ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)"
+            ))
+            # Resumable uploads can exceed 2 GB
+            conn.execute(text(
+                "ALTER TABLE uploaded_files ALTER COLUMN size TYPE BIGINT"
+            ))
+            conn.execute(text(
+                "ALTER TABLE uploaded_files ADD COLUMN IF NOT EXISTS extraction_status VARCHAR(32)"
+            ))
+            conn.execute(text(
+                "ALTER TABLE uploaded_files ADD COLUMN IF NOT EXISTS extraction_result JSON"
+            ))
+            conn.execute(text(
+                "ALTER TABLE uploaded_files ADD COLUMN IF NOT EXISTS extraction_error VARCHAR(1000)"
+            ))
+            conn.execute(text(
+                "ALTER TABLE uploaded_files ADD COLUMN IF NOT EXISTS extracted_at TIMESTAMP WITH TIME ZONE"
+            ))
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    sha256 VARCHAR(64) PRIMARY KEY,
+                    size BIGINT NOT NULL,
+                    ref_count INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL,
+                    last_referenced_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+                )
+            """))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_blobs_ref_count ON blobs(ref_count)"))
             conn.commit()
     except Exception:
         # Best-effort; avoid breaking startup if the table doesn't exist yet.
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Persistent cache for PDF extraction results, shared by every worker on the host
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+EXTRACTION_CACHE_PATH = os.getenv(
+    "EXTRACTION_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), "extraction_cache.sqlite3"),
+)
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+class ExtractionCache:
+    """
+    Size-bounded LRU cache backed by SQLite.
+
+    Extracted text is keyed by content hash alone, while the mapped extraction fields
+    are keyed by content hash, model and prompt version. A prompt change therefore
+    only re-runs the LLM stage and reuses the cached text. Title block boxes learned
+    per drawing template are kept here too, so they survive restarts.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._pid = os.getpid()
+        self._counters = {
+            "text_hits": 0,
+            "text_misses": 0,
+            "fields_hits": 0,
+            "fields_misses": 0,
+            "template_hits": 0,
+            "template_misses": 0,
+            "evictions": 0,
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            # A SQLite connection must not cross a fork. Page workers start from a
+            # forkserver and build their own cache, but the app itself may still be
+            # forked after import (e.g. a preloading process manager)
+            self._conn = None
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_entries_last_access ON cache_entries(last_access)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _get(self, key: str, counter: str):
+        with self._lock:
+            try:
+                conn = self._connection()
+                row = conn.execute("SELECT value FROM cache_entries WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self._counters[f"{counter}_misses"] += 1
+                    return None
+                conn.execute("UPDATE cache_entries SET last_access = ? WHERE key = ?", (time.time(), key))
+                conn.commit()
+                self._counters[f"{counter}_hits"] += 1
+                return json.loads(row[0])
+            except Exception as e:
+                # Best-effort; a broken cache should never fail an extraction
+                logger.warning(f"Extraction cache read failed: {e}")
+                self._counters[f"{counter}_misses"] += 1
+                return None
+
+    def _put(self, key: str, value) -> None:
+        payload = json.dumps(value)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            try:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, payload, size, time.time()),
+                )
+                self._evict(conn)
+                conn.commit()
+            except Exception as e:
+                logger.warning(f"Extraction cache write failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drops least recently used entries until the cache fits in max_bytes."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT key, size FROM cache_entries ORDER BY last_access ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            total -= size
+            self._counters["evictions"] += 1
+
+    def get_text(self, content_hash: str, variant: str = "") -> dict | None:
+        return self._get(f"text:{content_hash}:{variant}", "text")
+
+    def put_text(self, content_hash: str, text: dict, variant: str = "") -> None:
+        self._put(f"text:{content_hash}:{variant}", text)
+
+    def get_fields(self, content_hash: str, model: str, prompt_version: str) -> dict | None:
+        return self._get(f"fields:{content_hash}:{model}:{prompt_version}", "fields")
+
+    def put_fields(self, content_hash: str, model: str, prompt_version: str, fields: dict) -> None:
+        self._put(f"fields:{content_hash}:{model}:{prompt_version}", fields)
+
+    def get_template(self, fingerprint: str) -> list | None:
+        return self._get(f"template:{fingerprint}", "template")
+
+    def put_template(self, fingerprint: str, box: list) -> None:
+        self._put(f"template:{fingerprint}", box)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            try:
+                entries, size = self._connection().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries"
+                ).fetchone()
+            except Exception:
+                entries, size = 0, 0
+        stats.update({
+            "enabled": EXTRACTION_CACHE_ENABLED,
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+        })
+        return stats
+
+
+extraction_cache = ExtractionCache(EXTRACTION_CACHE_PATH, EXTRACTION_CACHE_MAX_BYTES)
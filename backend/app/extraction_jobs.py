@@ -0,0 +1,255 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable
+
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+from . import metrics
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Job workers pull from a bounded queue; the parse and LLM stages have separate limits
+EXTRACTION_JOB_WORKERS = int(os.getenv("EXTRACTION_JOB_WORKERS", "4"))
+EXTRACTION_PARSE_CONCURRENCY = int(os.getenv("EXTRACTION_PARSE_CONCURRENCY", "2"))
+EXTRACTION_LLM_CONCURRENCY = int(os.getenv("EXTRACTION_LLM_CONCURRENCY", "1"))
+EXTRACTION_MAX_QUEUED_JOBS = int(os.getenv("EXTRACTION_MAX_QUEUED_JOBS", "100"))
+EXTRACTION_JOB_TTL_SECONDS = int(os.getenv("EXTRACTION_JOB_TTL_SECONDS", "3600"))
+
+queue_depth = metrics.gauge("extraction_jobs_queue_depth", "Jobs waiting for a worker")
+jobs_running = metrics.gauge("extraction_jobs_running", "Jobs currently being processed")
+jobs_submitted = metrics.counter("extraction_jobs_submitted_total", "Jobs accepted into the queue")
+jobs_rejected = metrics.counter("extraction_jobs_rejected_total", "Jobs rejected because the queue was full")
+jobs_completed = metrics.counter("extraction_jobs_completed_total", "Jobs that finished successfully")
+jobs_failed = metrics.counter("extraction_jobs_failed_total", "Jobs that finished with an error")
+job_wait_seconds = metrics.histogram("extraction_job_wait_seconds", "Time a job spent queued before a worker picked it up")
+job_run_seconds = metrics.histogram("extraction_job_run_seconds", "Time a worker spent processing a job")
+parse_stage_wait_seconds = metrics.histogram("extraction_parse_stage_wait_seconds", "Time spent waiting for a parse stage slot")
+llm_stage_wait_seconds = metrics.histogram("extraction_llm_stage_wait_seconds", "Time spent waiting for an LLM stage slot")
+requests_coalesced = metrics.counter("extraction_requests_coalesced_total", "Extractions that shared an identical in-flight extraction instead of running their own")
+
+
+class ExtractionJob:
+    """State of a single queued PDF extraction."""
+
+    def __init__(self, filename: str, payload: Any):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.payload = payload
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.result: Any = None
+        self.error: dict | None = None
+        self.done = asyncio.Event()
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class ExtractionJobManager:
+    """
+    Runs PDF extractions off the event loop.
+
+    parse_fn is the CPU-bound text extraction stage and llm_fn the model stage; both
+    are blocking callables that run on a thread pool, each behind its own semaphore.
+    Jobs are fed to a fixed number of worker tasks through a bounded queue.
+
+    key_fn(payload) identifies identical work (e.g. content hash and model). While one
+    payload with a key is being processed, others with the same key wait for it and
+    share its result instead of running the stages again.
+    """
+
+    def __init__(
+        self,
+        parse_fn: Callable,
+        llm_fn: Callable,
+        key_fn: Callable[[Any], Hashable | None] | None = None,
+        workers: int = EXTRACTION_JOB_WORKERS,
+        parse_concurrency: int = EXTRACTION_PARSE_CONCURRENCY,
+        llm_concurrency: int = EXTRACTION_LLM_CONCURRENCY,
+        max_queued: int = EXTRACTION_MAX_QUEUED_JOBS,
+        job_ttl: int = EXTRACTION_JOB_TTL_SECONDS,
+    ):
+        self.parse_fn = parse_fn
+        self.llm_fn = llm_fn
+        self.key_fn = key_fn
+        self.workers = workers
+        self.parse_concurrency = parse_concurrency
+        self.llm_concurrency = llm_concurrency
+        self.max_queued = max_queued
+        self.job_ttl = job_ttl
+        self.jobs: dict[str, ExtractionJob] = {}
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=parse_concurrency + llm_concurrency,
+            thread_name_prefix="pdf-extraction",
+        )
+        self._queue: asyncio.Queue | None = None
+        self._parse_slots: asyncio.Semaphore | None = None
+        self._llm_slots: asyncio.Semaphore | None = None
+        self._worker_tasks: list[asyncio.Task] = []
+
+    def _ensure_started(self) -> None:
+        """Creates the queue, semaphores and worker tasks on the running loop."""
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._parse_slots = asyncio.Semaphore(self.parse_concurrency)
+        self._llm_slots = asyncio.Semaphore(self.llm_concurrency)
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _run_stage(self, slots: asyncio.Semaphore, wait_metric, fn: Callable, *args):
+        wait_start = time.monotonic()
+        async with slots:
+            wait_metric.observe(time.monotonic() - wait_start)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def run_parse(self, *args):
+        """Runs the parse stage on the thread pool, within the parse concurrency limit."""
+        # The semaphores only exist once started, and callers may come straight here
+        self._ensure_started()
+        return await self._run_stage(self._parse_slots, parse_stage_wait_seconds, self.parse_fn, *args)
+
+    async def run_llm(self, *args):
+        """Runs the LLM stage on the thread pool, within the LLM concurrency limit."""
+        self._ensure_started()
+        return await self._run_stage(self._llm_slots, llm_stage_wait_seconds, self.llm_fn, *args)
+
+    async def _run_stages(self, payload: Any, job: ExtractionJob | None = None):
+        if job:
+            job.status = "parsing"
+        parsed = await self.run_parse(payload)
+        if job:
+            job.status = "extracting"
+        return await self.run_llm(*parsed)
+
+    async def process(self, payload: Any, job: ExtractionJob | None = None):
+        """
+        Runs both stages for one payload and returns the LLM stage result, or waits
+        for an identical payload that is already in flight and returns its result.
+        """
+        self._ensure_started()
+        key = self.key_fn(payload) if self.key_fn else None
+        if key is None:
+            return await self._run_stages(payload, job)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            requests_coalesced.inc()
+            if job:
+                job.status = "coalesced"
+            try:
+                # Shielded so a follower going away does not cancel the shared work
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+            # The leading request went away before finishing; run the stages ourselves
+            return await self.process(payload, job)
+
+        future = asyncio.ensure_future(self._run_stages(payload, job))
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # The leader's payload backs the work, so its cancellation cancels the work too
+        return await future
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.job_ttl
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    async def submit(self, payload: Any, filename: str) -> ExtractionJob:
+        """Queues an extraction and returns its job. Raises 503 when the queue is full."""
+        self._ensure_started()
+        self._prune()
+        job = ExtractionJob(filename, payload)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            jobs_rejected.inc()
+            raise HTTPException(status_code=503, detail="Extraction queue is full, please retry later")
+        self.jobs[job.id] = job
+        jobs_submitted.inc()
+        queue_depth.set(self._queue.qsize())
+        return job
+
+    def get(self, job_id: str) -> ExtractionJob | None:
+        return self.jobs.get(job_id)
+
+    async def wait(self, job: ExtractionJob, timeout: float) -> ExtractionJob:
+        """Long-polls until the job finishes or the timeout elapses."""
+        if timeout > 0 and not job.done.is_set():
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            queue_depth.set(self._queue.qsize())
+            job.started_at = time.time()
+            job_wait_seconds.observe(job.started_at - job.created_at)
+            jobs_running.inc()
+            try:
+                result = await self.process(job.payload, job)
+                job.result = result.model_dump() if hasattr(result, "model_dump") else result
+                job.status = "completed"
+                jobs_completed.inc()
+            except HTTPException as e:
+                job.status = "failed"
+                job.error = {"status_code": e.status_code, "detail": e.detail}
+                jobs_failed.inc()
+            except Exception as e:
+                logger.error(f"Extraction job {job.id} failed: {e}", exc_info=True)
+                job.status = "failed"
+                job.error = {"status_code": 500, "detail": f"Error processing PDF: {str(e)}"}
+                jobs_failed.inc()
+            finally:
+                # Release the spooled PDF once the job no longer needs it
+                close = getattr(job.payload, "close", None)
+                if close:
+                    close()
+                job.payload = None
+                job.finished_at = time.time()
+                job_run_seconds.observe(job.finished_at - job.started_at)
+                jobs_running.dec()
+                job.done.set()
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "parse_concurrency": self.parse_concurrency,
+            "llm_concurrency": self.llm_concurrency,
+            "max_queued": self.max_queued,
+            "tracked_jobs": len(self.jobs),
+            "inflight_keys": len(self._inflight),
+            **metrics.snapshot("extraction_j"),
+            **metrics.snapshot("extraction_parse"),
+            **metrics.snapshot("extraction_llm"),
+            **metrics.snapshot("extraction_requests"),
+        }
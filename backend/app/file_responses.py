@@ -0,0 +1,194 @@
+import os
+import re
+import uuid
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterator
+from urllib.parse import quote
+
+from fastapi import Request, HTTPException
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+RANGE_READ_CHUNK_SIZE = 1024 * 1024
+# More ranges than this in one request are ignored and the whole file is sent
+MAX_RANGES = 32
+# Stored files never change under the same name, so clients may keep them
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+_RANGE_SPEC = re.compile(r"^\s*(\d*)\s*-\s*(\d*)\s*$")
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match comparison, which is weak: W/ prefixes are ignored."""
+    if header.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in header.split(","))
+
+
+def _http_date(value: datetime) -> str:
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def _not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-Modified-Since is ignored whenever If-None-Match is present
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def _range_applies(request: Request, etag: str, last_modified: datetime) -> bool:
+    """If-Range: ranges are only served when the client's copy is still current."""
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # Needs a strong match
+        return not etag.startswith("W/") and if_range == etag
+    try:
+        return parsedate_to_datetime(if_range) == last_modified.replace(microsecond=0)
+    except (TypeError, ValueError):
+        return False
+
+
+def parse_range(header: str, size: int) -> list[tuple[int, int]] | None:
+    """
+    Parses a bytes Range header into inclusive (start, end) pairs, sorted and with
+    overlapping or adjacent ranges merged. Returns None when the header is not a
+    usable bytes range (the whole file is sent) and [] when no range is satisfiable.
+    """
+    unit, _, specs = header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs:
+        return None
+    ranges = []
+    for spec in specs.split(","):
+        match = _RANGE_SPEC.match(spec)
+        if not match or match.group(1) == match.group(2) == "":
+            return None
+        first, last = match.groups()
+        if first == "":
+            # Suffix range: the last n bytes
+            length = int(last)
+            if length == 0:
+                continue
+            start, end = max(0, size - length), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if last and int(last) < start:
+                return None
+            if start >= size:
+                continue
+        ranges.append((start, end))
+    if len(ranges) > MAX_RANGES:
+        return None
+
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _iter_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(RANGE_READ_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _iter_multipart(path: str, ranges: list[tuple[int, int]], size: int, media_type: str, boundary: str) -> Iterator[bytes]:
+    for start, end in ranges:
+        yield (
+            f"--{boundary}\r\nContent-Type: {media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode("latin-1")
+        yield from _iter_range(path, start, end)
+        yield b"\r\n"
+    yield f"--{boundary}--\r\n".encode("latin-1")
+
+
+def _content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted == filename:
+        return f'attachment; filename="{filename}"'
+    return f"attachment; filename*=utf-8''{quoted}"
+
+
+def stored_file_response(
+    request: Request,
+    path: str,
+    filename: str,
+    content_hash: str | None,
+    last_modified: datetime,
+    media_type: str = "application/octet-stream",
+) -> Response:
+    """
+    Serves a stored file with validators and byte ranges: 304 for a matching
+    If-None-Match / If-Modified-Since, 206 for one range, multipart/byteranges for
+    several, 416 for unsatisfiable ones, otherwise the whole file. The ETag is the
+    content hash (strong); files stored without one get a weak size/mtime tag.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Stored file missing")
+    size = stat.st_size
+    etag = f'"{content_hash}"' if content_hash else f'W/"{size:x}-{stat.st_mtime_ns:x}"'
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": _http_date(last_modified),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    headers["Content-Disposition"] = _content_disposition(filename)
+    range_header = request.headers.get("range")
+    ranges = None
+    if range_header and _range_applies(request, etag, last_modified):
+        ranges = parse_range(range_header, size)
+
+    if ranges is None:
+        return FileResponse(path, media_type=media_type, headers=headers)
+    if not ranges:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(_iter_range(path, start, end), status_code=206, media_type=media_type, headers=headers)
+
+    boundary = uuid.uuid4().hex
+    length = sum(
+        len(f"--{boundary}\r\nContent-Type: {media_type}\r\nContent-Range: bytes {start}-{end}/{size}\r\n\r\n")
+        + (end - start + 1) + 2
+        for start, end in ranges
+    ) + len(f"--{boundary}--\r\n")
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(
+        _iter_multipart(path, ranges, size, media_type, boundary),
+        status_code=206,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers=headers,
+    )
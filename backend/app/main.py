@@ -2,6 +2,7 @@ import os
 import sys
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 # Support running as a script: `python main.py`
 if __package__ is None or __package__ == "":
@@ -10,15 +11,17 @@ if __package__ is None or __package__ == "":
     from app.uploads import router as uploads_router  # type: ignore
     from app.projects import router as projects_router  # type: ignore
     from app.time_tracking import router as time_tracking_router  # type: ignore
-    from app.pdf_extraction import router as pdf_extraction_router  # type: ignore
+    from app.pdf_extraction import router as pdf_extraction_router, ollama_manager, start_page_pool  # type: ignore
     from app.db import ensure_uploaded_files_schema, ensure_projects_schema, ensure_auth_schema  # type: ignore
+    from app import metrics, upload_sessions  # type: ignore
 else:
     from .auth import router as auth_router
     from .uploads import router as uploads_router
     from .projects import router as projects_router
     from .time_tracking import router as time_tracking_router
-    from .pdf_extraction import router as pdf_extraction_router
+    from .pdf_extraction import router as pdf_extraction_router, ollama_manager, start_page_pool
     from .db import ensure_uploaded_files_schema, ensure_projects_schema, ensure_auth_schema
+    from . import metrics, upload_sessions
 
 app = FastAPI()
 
@@ -36,11 +39,35 @@ app.include_router(projects_router)
 app.include_router(time_tracking_router)
 app.include_router(pdf_extraction_router)
 
+@app.on_event("startup")
+def start_ollama_manager():
+    # Health checks and model warm-up run in the background so startup never blocks on Ollama
+    ollama_manager.start()
+
+
+@app.on_event("startup")
+def start_pdf_page_pool():
+    # Worker processes are started before requests arrive rather than on the first large PDF
+    start_page_pool()
+
+
+@app.on_event("startup")
+async def start_upload_session_sweeper():
+    # Abandoned resumable uploads are deleted even when no new session is started
+    upload_sessions.start_session_sweeper()
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Extraction pipeline metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 # Ensure schema columns for uploaded_files table exist on startup
 ensure_uploaded_files_schema()
 ensure_projects_schema()
@@ -0,0 +1,245 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+
+class Counter:
+    """Monotonically increasing counter."""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> dict:
+        return {"value": self._value}
+
+
+class Gauge:
+    """Value that can go up and down, e.g. a queue depth."""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> dict:
+        return {"value": self._value}
+
+
+# Seconds; covers sub-millisecond cache hits up to multi-minute LLM calls on CPU hosts
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class Histogram:
+    """Cumulative bucket histogram with count and sum, in the Prometheus style."""
+
+    def __init__(self, name: str, description: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def cumulative_buckets(self) -> list[tuple[float, int]]:
+        """Returns (upper bound, cumulative count) pairs, ending with +Inf."""
+        with self._lock:
+            counts = list(self._counts)
+        cumulative = []
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            cumulative.append((bound, running))
+        return cumulative
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self._count,
+            "sum": round(self._sum, 6),
+            "avg": round(self._sum / self._count, 6) if self._count else None,
+            "buckets": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in self.cumulative_buckets()
+            },
+        }
+
+
+_registry: dict[str, Counter | Gauge | Histogram] = {}
+_registry_lock = threading.Lock()
+
+
+def _register(metric_cls, name: str, description: str, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = metric_cls(name, description, **kwargs)
+            _registry[name] = metric
+        return metric
+
+
+def counter(name: str, description: str) -> Counter:
+    """Returns the registered counter with this name, creating it on first use."""
+    return _register(Counter, name, description)
+
+
+def gauge(name: str, description: str) -> Gauge:
+    """Returns the registered gauge with this name, creating it on first use."""
+    return _register(Gauge, name, description)
+
+
+def histogram(name: str, description: str, buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    """Returns the registered histogram with this name, creating it on first use."""
+    return _register(Histogram, name, description, buckets=buckets)
+
+
+def snapshot(prefix: str = "") -> dict:
+    """JSON-friendly view of every registered metric whose name starts with prefix."""
+    with _registry_lock:
+        metrics = [m for name, m in _registry.items() if name.startswith(prefix)]
+    return {m.name: m.snapshot() for m in metrics}
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_prometheus() -> str:
+    """Every registered metric in the Prometheus text exposition format (version 0.0.4)."""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    lines = []
+    for metric in metrics:
+        description = metric.description.replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {metric.name} {description}")
+        if isinstance(metric, Histogram):
+            lines.append(f"# TYPE {metric.name} histogram")
+            for bound, count in metric.cumulative_buckets():
+                lines.append(f'{metric.name}_bucket{{le="{_format_value(bound)}"}} {count}')
+            lines.append(f"{metric.name}_sum {_format_value(metric.sum)}")
+            lines.append(f"{metric.name}_count {metric.count}")
+        else:
+            metric_type = "counter" if isinstance(metric, Counter) else "gauge"
+            lines.append(f"# TYPE {metric.name} {metric_type}")
+            lines.append(f"{metric.name} {_format_value(metric.value)}")
+    return "\n".join(lines) + "\n"
+
+
+class Trace:
+    """
+    Per-request record of stage timings, counts (pages, bytes, tokens) and notes such
+    as the fallback path taken. Activated for a block of code with activate(); stage()
+    and the helpers below add to the active trace, if any.
+    """
+
+    def __init__(self):
+        self.stages: dict[str, list[float]] = {}
+        self.counts: dict[str, float] = {}
+        self.notes: dict[str, object] = {}
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        self.stages.setdefault(name, []).append(seconds)
+
+    @contextmanager
+    def activate(self) -> Iterator["Trace"]:
+        token = _current_trace.set(self)
+        try:
+            yield self
+        finally:
+            _current_trace.reset(token)
+
+    def to_dict(self) -> dict:
+        return {
+            "stages": {
+                name: {"calls": len(durations), "ms": round(sum(durations) * 1000, 3)}
+                for name, durations in self.stages.items()
+            },
+            "counts": dict(self.counts),
+            "notes": dict(self.notes),
+        }
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("extraction_trace", default=None)
+
+
+def current_trace() -> Trace | None:
+    return _current_trace.get()
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Observes a stage duration in extraction_stage_<name>_seconds and the active trace."""
+    histogram(f"extraction_stage_{name}_seconds", f"Time spent in the {name} extraction stage").observe(seconds)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_stage(name, seconds)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Times the block as the given extraction stage (see record_stage)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def trace_count(key: str, amount: float = 1) -> None:
+    """Adds to a count on the active trace, if any."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.counts[key] = trace.counts.get(key, 0) + amount
+
+
+def trace_note(key: str, value) -> None:
+    """Records a note (e.g. which fallback path was taken) on the active trace, if any."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.notes[key] = value
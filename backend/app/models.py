@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Integer, DateTime, func, Boolean
+from sqlalchemy import String, Integer, BigInteger, DateTime, func, Boolean, JSON
 from datetime import datetime
 from .db import Base
 
@@ -19,14 +19,37 @@ class UploadedFile(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     original_name: Mapped[str] = mapped_column(String(512), nullable=False)
+    # File name under app/uploads, or the content hash for files kept in the blob store
     stored_name: Mapped[str] = mapped_column(String(512), nullable=False)
-    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # SHA-256 of the stored bytes, computed while the upload was written
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=True)
     stage: Mapped[int] = mapped_column(Integer, nullable=False)
     # Optional Delivery Point association for finer grouping within a stage
     dp_id: Mapped[int] = mapped_column(Integer, nullable=True)
     project_name: Mapped[str] = mapped_column(String(255), nullable=True)
     user_email: Mapped[str] = mapped_column(String(255), nullable=True)
     created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # PDF metadata extraction: queued / running / completed / failed, or null if never requested
+    extraction_status: Mapped[str] = mapped_column(String(32), nullable=True)
+    extraction_result: Mapped[dict] = mapped_column(JSON, nullable=True)
+    extraction_error: Mapped[str] = mapped_column(String(1000), nullable=True)
+    extracted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    @property
+    def in_blob_store(self) -> bool:
+        return self.content_hash is not None and self.stored_name == self.content_hash
+
+
+class Blob(Base):
+    """A stored file, kept once per content hash and shared by the uploads referencing it."""
+    __tablename__ = "blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    ref_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_referenced_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
 
 class Project(Base):
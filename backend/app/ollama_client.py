@@ -0,0 +1,203 @@
+import os
+import time
+import logging
+import threading
+
+import ollama
+from dotenv import load_dotenv
+
+from . import metrics
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# How long Ollama keeps the model loaded after a request (Ollama duration string)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Seconds between background health checks
+OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "30"))
+# Seconds before a single model request times out
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "300"))
+
+# Model calls on CPU-only hosts can take minutes
+MODEL_CALL_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+
+model_call_seconds = metrics.histogram("ollama_model_call_seconds", "Latency of Ollama model calls", MODEL_CALL_BUCKETS)
+model_call_errors = metrics.counter("ollama_model_call_errors_total", "Ollama model calls that raised")
+health_checks = metrics.counter("ollama_health_checks_total", "Background Ollama health checks")
+warmups = metrics.counter("ollama_warmups_total", "Model warm-up requests sent to Ollama")
+
+
+def _model_names(models_response) -> list[str]:
+    """Handles the different response formats of client.list() across ollama versions."""
+    if isinstance(models_response, dict):
+        models_list = models_response.get('models', [])
+    elif hasattr(models_response, 'models'):
+        models_list = models_response.models
+    elif isinstance(models_response, list):
+        models_list = models_response
+    else:
+        models_list = []
+    names = []
+    for m in models_list or []:
+        if isinstance(m, dict):
+            names.append(m.get('name') or m.get('model'))
+        else:
+            names.append(getattr(m, 'name', None) or getattr(m, 'model', None) or str(m))
+    return [n for n in names if n]
+
+
+class OllamaClientManager:
+    """
+    Owns one long-lived Ollama client for the process.
+
+    The client keeps its HTTP connections alive between requests. A background thread
+    re-checks availability periodically and warms the model up whenever Ollama comes
+    (back) online, so the first extraction does not pay the model-load cost.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        model: str,
+        keep_alive: str = OLLAMA_KEEP_ALIVE,
+        health_interval: float = OLLAMA_HEALTH_INTERVAL,
+        timeout: float = OLLAMA_TIMEOUT,
+        extra_models: list[str] | None = None,
+    ):
+        self.host = host
+        self.model = model
+        # Further models used by the service (e.g. the cascade's fast tier), warmed up too
+        self.extra_models = [m for m in extra_models or [] if m and m != model]
+        self.keep_alive = keep_alive
+        self.health_interval = health_interval
+        self.timeout = timeout
+        self.models: list[str] = []
+        self.last_check: float | None = None
+        self.last_error: str | None = None
+        self.warm = False
+        self._available = False
+        self._client: ollama.Client | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def client(self) -> ollama.Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = ollama.Client(host=self.host, timeout=self.timeout)
+        return self._client
+
+    @property
+    def available(self) -> bool:
+        # Before the background thread has run (e.g. in scripts), check on first use
+        if self.last_check is None:
+            self.check_health()
+        return self._available
+
+    def check_health(self) -> bool:
+        """Refreshes availability and warms the model up when Ollama has just come online."""
+        health_checks.inc()
+        first_check = self.last_check is None
+        was_available = self._available
+        try:
+            self.models = _model_names(self.client.list())
+            self._available = bool(self.models)
+            self.last_error = None if self.models else "Ollama is running but no models found"
+        except Exception as e:
+            self._available = False
+            self.warm = False
+            self.last_error = str(e)
+        self.last_check = time.time()
+
+        if self._available and not was_available:
+            logger.info(f"Ollama is available. Using model: {self.model}")
+            logger.info(f"Available models: {self.models}")
+        elif not self._available and (was_available or first_check):
+            logger.warning(f"Ollama not available: {self.last_error}. Make sure Ollama is running on {self.host}")
+
+        if self._available and not self.warm:
+            self.warm_up()
+        return self._available
+
+    def warm_up(self) -> None:
+        """Loads the models into memory and asks Ollama to keep them resident."""
+        warmed = True
+        for model in [self.model, *self.extra_models]:
+            if model not in self.models and f"{model}:latest" not in self.models:
+                logger.warning(f"Model {model} is not pulled; skipping warm-up")
+                warmed = False
+                continue
+            try:
+                warmups.inc()
+                start = time.monotonic()
+                # An empty prompt only loads the model
+                self.client.generate(model=model, prompt="", keep_alive=self.keep_alive)
+                logger.info(f"Warmed up {model} in {time.monotonic() - start:.1f}s")
+            except Exception as e:
+                logger.warning(f"Ollama warm-up of {model} failed: {e}")
+                warmed = False
+        self.warm = warmed
+
+    def chat(self, **kwargs):
+        """client.chat with keep_alive set and the latency recorded (non-streaming)."""
+        kwargs.setdefault("keep_alive", self.keep_alive)
+        start = time.monotonic()
+        try:
+            return self.client.chat(**kwargs)
+        except Exception:
+            model_call_errors.inc()
+            raise
+        finally:
+            model_call_seconds.observe(time.monotonic() - start)
+
+    def chat_stream(self, **kwargs):
+        """
+        Streaming client.chat. Latency is recorded when the stream is exhausted or
+        closed; closing it early cancels generation on the Ollama side.
+        """
+        kwargs.setdefault("keep_alive", self.keep_alive)
+        start = time.monotonic()
+        stream = self.client.chat(stream=True, **kwargs)
+        try:
+            yield from stream
+        except Exception:
+            model_call_errors.inc()
+            raise
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+            model_call_seconds.observe(time.monotonic() - start)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.check_health()
+            self._stop.wait(self.health_interval)
+
+    def start(self) -> None:
+        """Starts the background health check thread (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ollama-health", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def status(self) -> dict:
+        return {
+            "available": self._available,
+            "host": self.host,
+            "model": self.model,
+            "extra_models": self.extra_models,
+            "models": self.models,
+            "warm": self.warm,
+            "keep_alive": self.keep_alive,
+            "last_check": self.last_check,
+            "last_error": self.last_error,
+            **metrics.snapshot("ollama_"),
+        }
@@ -1,14 +1,33 @@
 import re
 import os
 import json
-from fastapi import APIRouter, UploadFile, File, HTTPException
+import math
+import time
+import asyncio
+import threading
+import multiprocessing
+from collections import deque
+from itertools import chain, islice
+from typing import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from .schemas import PDFExtractionResponse
+from .extraction_cache import extraction_cache, EXTRACTION_CACHE_ENABLED
+from .extraction_jobs import ExtractionJobManager
+from .pdf_ingest import SpooledPDF, ingest_pdf_upload, open_pdf_stream
+from .pdf_preflight import classify_pdf, PDF_PREFLIGHT_ENABLED
+from .prompt_builder import build_prompt_context
+from .title_block import title_block_box
+from . import metrics
 import pdfplumber
+from pdfplumber.utils import extract_text as extract_text_from_chars
 import PyPDF2
-from io import BytesIO
 import logging
 from dotenv import load_dotenv
-import ollama
+from .ollama_client import OllamaClientManager
 
 load_dotenv()
 
@@ -20,108 +39,537 @@ logger = logging.getLogger(__name__)
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral:latest")  # Default to llama3.1 for better instruction following
 
-# Check if Ollama is available
-ollama_available = False
-try:
-    client = ollama.Client(host=OLLAMA_BASE_URL)
-    models_response = client.list()
-    
-    # Handle different response formats from Ollama API
-    if isinstance(models_response, dict):
-        models_list = models_response.get('models', [])
-    elif hasattr(models_response, 'models'):
-        models_list = models_response.models
-    elif isinstance(models_response, list):
-        models_list = models_response
-    else:
-        models_list = []
+# One long-lived client per process; availability is refreshed in the background
+# (started with the app) instead of being probed once at import time
+
+# Cascade: when OLLAMA_FAST_MODEL is set, it answers every request first and only the
+# fields it leaves null, or gives values not found in the PDF text, are re-asked of
+# OLLAMA_MODEL. Values count as found when OLLAMA_CASCADE_GROUNDING of their words are.
+OLLAMA_FAST_MODEL = os.getenv("OLLAMA_FAST_MODEL", "")
+OLLAMA_CASCADE_GROUNDING = float(os.getenv("OLLAMA_CASCADE_GROUNDING", "0.6"))
+# Model part of the cached fields key: both tiers decide the result
+EXTRACTION_MODEL_KEY = f"{OLLAMA_FAST_MODEL}+{OLLAMA_MODEL}" if OLLAMA_FAST_MODEL else OLLAMA_MODEL
+
+ollama_manager = OllamaClientManager(OLLAMA_BASE_URL, OLLAMA_MODEL, extra_models=[OLLAMA_FAST_MODEL])
+
+cascade_fast_resolved = metrics.counter("extraction_cascade_fast_resolved_total", "Cascade extractions answered entirely by the fast model")
+cascade_escalations = metrics.counter("extraction_cascade_escalations_total", "Cascade extractions that re-asked the large model")
+cascade_escalated_fields = metrics.counter("extraction_cascade_escalated_fields_total", "Fields re-asked of the large model")
+cascade_large_filled_fields = metrics.counter("extraction_cascade_large_filled_fields_total", "Escalated fields the large model answered")
+cascade_fast_seconds = metrics.histogram("extraction_cascade_fast_seconds", "Latency of the cascade's fast tier")
+cascade_large_seconds = metrics.histogram("extraction_cascade_large_seconds", "Latency of the cascade's large tier")
+
+# Page-parallel extraction: documents with at least PDF_PARALLEL_MIN_PAGES pages are
+# split across PDF_EXTRACTION_WORKERS processes (1 keeps the sequential path)
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", "1"))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "24"))
+
+# Metadata scan: the extraction endpoints only need the title block, which repeats on
+# every sheet, so pages are read in PDF_METADATA_SCAN_ORDER ("spread": first, last, then
+# evenly spaced; "sequential": page order) until the same title block has been seen on
+# PDF_TITLE_BLOCK_STABLE_PAGES pages. The debug endpoint always extracts every page.
+PDF_METADATA_SCAN = os.getenv("PDF_METADATA_SCAN", "true").lower() in ("1", "true", "yes")
+PDF_METADATA_SCAN_ORDER = os.getenv("PDF_METADATA_SCAN_ORDER", "spread")
+PDF_TITLE_BLOCK_STABLE_PAGES = int(os.getenv("PDF_TITLE_BLOCK_STABLE_PAGES", "3"))
+# Share of title block lines two pages must have in common to count as the same title block
+PDF_TITLE_BLOCK_SIMILARITY = float(os.getenv("PDF_TITLE_BLOCK_SIMILARITY", "0.7"))
+# With page workers, a scan of a large document that hasn't found a stable title block
+# after this many pages hands the remaining pages to the process pool
+PDF_METADATA_SCAN_PROBE_PAGES = int(os.getenv("PDF_METADATA_SCAN_PROBE_PAGES", "8"))
+
+pages_scanned = metrics.counter("pdf_pages_scanned_total", "Pages extracted by metadata scans")
+pages_skipped = metrics.counter("pdf_pages_skipped_total", "Pages skipped by metadata scans once the title block was stable")
+pages_extracted = metrics.counter("pdf_pages_extracted_total", "Pages run through pdfplumber text extraction")
+pdf_bytes_parsed = metrics.counter("pdf_bytes_parsed_total", "Bytes of PDFs that reached the parse stage")
+ollama_prompt_eval_tokens = metrics.counter("ollama_prompt_eval_tokens_total", "Prompt tokens evaluated by Ollama, as reported in its replies")
+ollama_eval_tokens = metrics.counter("ollama_eval_tokens_total", "Tokens generated by Ollama, as reported in its replies")
+
+# Stream tokens from Ollama and stop generating once the JSON object is complete
+OLLAMA_STREAMING = os.getenv("OLLAMA_STREAMING", "true").lower() in ("1", "true", "yes")
+
+# Ask Ollama for JSON constrained to the response schema; false restores the free-form
+# prompt with its JSON repair and key alias mapping
+OLLAMA_STRUCTURED_OUTPUT = os.getenv("OLLAMA_STRUCTURED_OUTPUT", "true").lower() in ("1", "true", "yes")
+
+# Bump when the prompt or response mapping changes so cached LLM results are not reused
+PROMPT_VERSION = "3" if OLLAMA_STRUCTURED_OUTPUT else "2"
+
+# Maximum number of files accepted by one batch extraction request
+PDF_BATCH_MAX_FILES = int(os.getenv("PDF_BATCH_MAX_FILES", "100"))
+
+# Bump when the text extraction output changes so cached text is not reused
+TEXT_EXTRACTION_VERSION = "4"
+
+
+INSUFFICIENT_TEXT_DETAIL = (
+    "Could not extract sufficient text from PDF. The PDF might be image-based or encrypted. "
+    "Please ensure the PDF contains selectable text."
+)
+
+
+class OllamaExtractionError(Exception):
+    """Raised instead of falling back to pattern matching when the caller asks for it."""
+
+
+class PageRecord:
+    """Extracted content of one page: full text, title block crops and table rows."""
+    __slots__ = ("page_num", "text", "title_block", "title_block_wide", "table_rows")
     
-    if models_list and len(models_list) > 0:
-        ollama_available = True
-        model_names = [m.get('name') if isinstance(m, dict) else getattr(m, 'name', str(m)) for m in models_list]
-        logger.info(f"Ollama is available. Using model: {OLLAMA_MODEL}")
-        logger.info(f"Available models: {model_names}")
-    else:
-        logger.warning("Ollama is running but no models found. Please pull a model first.")
-except Exception as e:
-    logger.warning(f"Ollama not available: {e}. Make sure Ollama is running on {OLLAMA_BASE_URL}")
+    def __init__(self, page_num: int, text: str | None, title_block: str | None, title_block_wide: str | None, table_rows: list[str]):
+        self.page_num = page_num
+        self.text = text
+        self.title_block = title_block
+        self.title_block_wide = title_block_wide
+        self.table_rows = table_rows
+    
+    def to_list(self) -> list:
+        return [self.page_num, self.text, self.title_block, self.title_block_wide, self.table_rows]
 
 
-def extract_text_from_pdf(pdf_file: bytes, focus_bottom_right: bool = True) -> tuple[str, str]:
+class ExtractedText:
     """
-    Extracts text from the uploaded PDF using pdfplumber.
-    Focuses on bottom-right corner (title block area) where project details are typically located.
-    Returns full text and title block text separately.
+    Page records of a document plus any PyPDF2 fallback text.
+    The flattened full text and title block text are built once, on first access;
+    iter_lines() walks the records lazily without building them at all.
+    """
+    __slots__ = ("records", "fallback_pages", "page_count", "_full_text", "_title_block_text")
+    
+    def __init__(self, records: list[PageRecord], fallback_pages: list[str] | None = None, page_count: int | None = None):
+        self.records = records
+        self.fallback_pages = fallback_pages or []
+        # Pages in the document; more than len(records) after a metadata scan
+        self.page_count = len(records) if page_count is None else page_count
+        self._full_text: str | None = None
+        self._title_block_text: str | None = None
+    
+    @property
+    def pages_skipped(self) -> int:
+        return max(0, self.page_count - len(self.records))
+    
+    def _full_text_parts(self) -> Iterator[str]:
+        for record in self.records:
+            if record.text:
+                yield f"\n--- Page {record.page_num} ---\n" + record.text + "\n"
+            for row_text in record.table_rows:
+                yield row_text + "\n"
+        for page_text in self.fallback_pages:
+            yield page_text + "\n"
+    
+    def _title_block_parts(self) -> Iterator[str]:
+        # Wide crops already added; identical title blocks repeat on every sheet
+        seen_wide_texts = set()
+        for record in self.records:
+            if record.title_block:
+                yield f"\n--- Page {record.page_num} Title Block ---\n" + record.title_block + "\n"
+            wide_text = record.title_block_wide
+            if wide_text and wide_text != record.title_block and wide_text not in seen_wide_texts:
+                seen_wide_texts.add(wide_text)
+                yield f"\n--- Page {record.page_num} Title Block (Wide) ---\n" + wide_text + "\n"
+            for row_text in record.table_rows:
+                yield row_text + "\n"
+    
+    @property
+    def full_text(self) -> str:
+        if self._full_text is None:
+            self._full_text = "".join(self._full_text_parts())
+        return self._full_text
+    
+    @property
+    def title_block_text(self) -> str:
+        if self._title_block_text is None:
+            self._title_block_text = "".join(self._title_block_parts())
+        return self._title_block_text
+    
+    def iter_lines(self, region: str = "full") -> Iterator[str]:
+        """Yields the non-blank lines of the "full" text or the "title_block" text, lazily."""
+        parts = self._title_block_parts() if region == "title_block" else self._full_text_parts()
+        for part in parts:
+            for line in part.split('\n'):
+                if line.strip():
+                    yield line
+    
+    def add_fallback_pages(self, pages: list[str]) -> None:
+        self.fallback_pages.extend(pages)
+        self._full_text = None
+    
+    def to_dict(self) -> dict:
+        return {
+            "records": [record.to_list() for record in self.records],
+            "fallback_pages": self.fallback_pages,
+            "page_count": self.page_count,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "ExtractedText":
+        return cls([PageRecord(*values) for values in data["records"]], data.get("fallback_pages"), data.get("page_count"))
+
+
+def _extract_page_record(page, focus_bottom_right: bool) -> PageRecord:
     """
-    full_text = ""
-    title_block_text = ""
+    Analyzes a single page in one pass over its characters.
+    The page's chars are gathered once; the full text and the title block crops are
+    derived from that list instead of re-running crop and text extraction per region.
+    The title block is the box located for the page's drawing template when there is
+    one (see title_block.py); otherwise two fixed bottom-right boxes are used.
+    """
+    with metrics.stage("page_text"):
+        # pdfplumber parses the page layout once and caches the char objects
+        chars = page.chars
+        
+        # Extract full page text
+        page_text = extract_text_from_chars(chars)
+    cropped_text = None
+    cropped_wide_text = None
+    
+    # Extract text from bottom-right corner (title block area)
+    box = None
+    if focus_bottom_right:
+        with metrics.stage("title_block_locate"):
+            box = title_block_box(page, chars)
+    
+    if box is not None:
+        crop_start = time.perf_counter()
+        # A located box is tight already, so there is no wide fallback crop
+        box_x0, box_top, box_x1, box_bottom = box
+        title_chars = [
+            char for char in chars
+            if char["x1"] > box_x0 and char["x0"] < box_x1 and char["bottom"] > box_top and char["top"] < box_bottom
+        ]
+        cropped_text = extract_text_from_chars(title_chars)
+        metrics.record_stage("title_block_crops", time.perf_counter() - crop_start)
+    elif focus_bottom_right:
+        crop_start = time.perf_counter()
+        # Get page dimensions
+        width = page.width
+        height = page.height
+        
+        # Title block: bottom 30% from the middle to the right edge.
+        # Wide title block: bottom 30% from 30% across, in case the title block is wider.
+        # The same chars a page.crop() of either box would keep (anything overlapping it).
+        top = height * 0.7
+        title_x0 = width * 0.5
+        wide_x0 = width * 0.3
+        title_chars = []
+        wide_chars = []
+        for char in chars:
+            if char["bottom"] <= top or char["top"] >= height:
+                continue
+            x0 = char["x0"]
+            x1 = char["x1"]
+            if x0 >= width or x1 <= wide_x0:
+                continue
+            wide_chars.append(char)
+            if x1 > title_x0:
+                title_chars.append(char)
+        
+        cropped_text = extract_text_from_chars(title_chars)
+        cropped_wide_text = extract_text_from_chars(wide_chars)
+        metrics.record_stage("title_block_crops", time.perf_counter() - crop_start)
+    
+    # Also extract tables (many PDFs have data in tables).
+    # The default table settings only find tables along ruling lines, so pages
+    # without any edges cannot contain one and skip the table finder entirely.
+    table_rows = []
+    if page.edges:
+        with metrics.stage("tables"):
+            tables = page.extract_tables()
+        for table in tables:
+            for row in table:
+                if row:
+                    table_rows.append(" ".join([str(cell) if cell else "" for cell in row]))
+    
+    return PageRecord(page.page_number, page_text, cropped_text, cropped_wide_text, table_rows)
+
+
+def _iter_page_range(
+    pdf_file: bytes | str, start: int, stop: int | None, focus_bottom_right: bool, skip: frozenset = frozenset()
+) -> Iterator[PageRecord]:
+    """Yields the records of pages [start, stop), one page at a time, leaving out the indices in skip."""
+    with open_pdf_stream(pdf_file) as stream, pdfplumber.open(stream) as pdf:
+        for index, page in enumerate(pdf.pages[start:stop], start):
+            if index not in skip:
+                yield _extract_page_record(page, focus_bottom_right)
+
+
+def _extract_page_range(
+    pdf_file: bytes | str, start: int, stop: int | None, focus_bottom_right: bool, skip: frozenset = frozenset()
+) -> tuple[list[PageRecord], str | None, dict[str, list[float]]]:
+    """
+    Extracts pages [start, stop) but those in skip and returns their records in page order.
+    Module-level so it can run inside a worker process. An error stops the range
+    early and is returned alongside the pages extracted before it. The stage timings
+    are returned too, since the worker's own metrics never reach the parent.
+    """
+    records = []
+    trace = metrics.Trace()
+    with trace.activate():
+        try:
+            for record in _iter_page_range(pdf_file, start, stop, focus_bottom_right, skip):
+                records.append(record)
+        except Exception as e:
+            return records, str(e), trace.stages
+    return records, None, trace.stages
+
+
+_page_pool: ProcessPoolExecutor | None = None
+_page_pool_lock = threading.Lock()
+
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    """
+    Returns the shared page extraction process pool, creating it if needed. Workers
+    come from a forkserver rather than being forked from the server, which runs
+    threads (the Ollama manager, the threadpool) whose locks a fork could copy held.
+    """
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(
+                max_workers=PDF_EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        return _page_pool
+
+
+def start_page_pool() -> None:
+    """Starts the page extraction workers at startup, so the first request doesn't wait for them."""
+    if PDF_EXTRACTION_WORKERS <= 1:
+        return
+    pool = _get_page_pool()
+    for _ in range(PDF_EXTRACTION_WORKERS):
+        pool.submit(os.getpid)
+    logger.info(f"Started the page extraction pool with {PDF_EXTRACTION_WORKERS} workers")
+
+
+def _reset_page_pool() -> None:
+    """Drops a broken pool so the next parallel extraction starts a fresh one."""
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is not None:
+            _page_pool.shutdown(wait=False, cancel_futures=True)
+            _page_pool = None
+
+
+def _iter_pages_parallel(
+    pdf_file: bytes | str, page_count: int, focus_bottom_right: bool, workers: int, skip: frozenset = frozenset()
+) -> Iterator[PageRecord]:
+    """
+    Splits the pages (but those in skip) into contiguous chunks, extracts them on the
+    process pool and yields the records in page order as each chunk completes.
+    """
+    pages = [index for index in range(page_count) if index not in skip]
+    chunk_size = math.ceil(len(pages) / workers)
+    ranges = [
+        (pages[first], pages[min(first + chunk_size, len(pages)) - 1] + 1)
+        for first in range(0, len(pages), chunk_size)
+    ]
+    
+    pool = _get_page_pool()
+    futures = [
+        pool.submit(_extract_page_range, pdf_file, start, stop, focus_bottom_right, skip)
+        for start, stop in ranges
+    ]
     
     try:
-        with pdfplumber.open(BytesIO(pdf_file)) as pdf:
-            for page_num, page in enumerate(pdf.pages, 1):
-                # Extract full page text
-                page_text = page.extract_text()
-                if page_text:
-                    full_text += f"\n--- Page {page_num} ---\n" + page_text + "\n"
-                
-                # Extract text from bottom-right corner (title block area)
-                if focus_bottom_right:
-                    # Get page dimensions
-                    width = page.width
-                    height = page.height
-                    
-                    # Focus on bottom-right 30% of the page (typical title block area)
-                    # This is usually where project details are located in drawings
-                    bbox = (
-                        width * 0.5,  # Start from middle horizontally
-                        height * 0.7,  # Start from 70% down vertically (bottom 30%)
-                        width,         # To right edge
-                        height         # To bottom edge
-                    )
-                    
-                    # Extract text from this region
-                    cropped = page.crop(bbox)
-                    cropped_text = cropped.extract_text()
-                    if cropped_text:
-                        title_block_text += f"\n--- Page {page_num} Title Block ---\n" + cropped_text + "\n"
-                    
-                    # Also try the entire bottom half in case title block is wider
-                    bbox_wide = (
-                        width * 0.3,  # Start from 30% horizontally
-                        height * 0.7, # Start from 70% down
-                        width,
-                        height
-                    )
-                    cropped_wide = page.crop(bbox_wide)
-                    cropped_wide_text = cropped_wide.extract_text()
-                    if cropped_wide_text and cropped_wide_text not in title_block_text:
-                        title_block_text += f"\n--- Page {page_num} Title Block (Wide) ---\n" + cropped_wide_text + "\n"
-                
-                # Also extract tables (many PDFs have data in tables)
-                tables = page.extract_tables()
-                if tables:
-                    for table in tables:
-                        for row in table:
-                            if row:
-                                row_text = " ".join([str(cell) if cell else "" for cell in row])
-                                full_text += row_text + "\n"
-                                title_block_text += row_text + "\n"
+        for future in futures:
+            records, error, stages = future.result()
+            for name, durations in stages.items():
+                for seconds in durations:
+                    metrics.record_stage(name, seconds)
+            yield from records
+            if error:
+                # Match the sequential path: keep the pages before the failure, drop the rest
+                logger.warning(f"pdfplumber extraction failed: {error}")
+                return
+    finally:
+        for pending in futures:
+            pending.cancel()
+
+
+def iter_page_records(pdf_file: bytes | str, focus_bottom_right: bool = True, workers: int | None = None) -> Iterator[PageRecord]:
+    """
+    Yields one PageRecord per page, in page order, as pages are extracted.
+    pdf_file is the PDF's bytes or the path of a spooled upload, which is memory-mapped
+    rather than read into memory (worker processes receive just the path).
+    
+    With more than one worker (defaults to PDF_EXTRACTION_WORKERS), documents of at least
+    PDF_PARALLEL_MIN_PAGES pages are split across a process pool. The records are
+    identical to the sequential path.
+    """
+    workers = PDF_EXTRACTION_WORKERS if workers is None else workers
+    yielded = 0
     
+    if workers > 1:
+        try:
+            with open_pdf_stream(pdf_file) as stream, pdfplumber.open(stream) as pdf:
+                page_count = len(pdf.pages)
+            if page_count >= PDF_PARALLEL_MIN_PAGES:
+                for record in _iter_pages_parallel(pdf_file, page_count, focus_bottom_right, workers):
+                    yield record
+                    yielded += 1
+                return
+        except BrokenProcessPool as e:
+            logger.warning(f"Page extraction pool failed, falling back to sequential extraction: {e}")
+            _reset_page_pool()
+        except Exception as e:
+            logger.warning(f"Parallel page extraction unavailable: {e}")
+    
+    # Sequential path; also resumes after the pages a broken pool already delivered
+    try:
+        yield from _iter_page_range(pdf_file, yielded, None, focus_bottom_right)
+    except Exception as e:
+        logger.warning(f"pdfplumber extraction failed: {e}")
+
+
+def metadata_scan_order(page_count: int, order: str = PDF_METADATA_SCAN_ORDER) -> Iterator[int]:
+    """
+    Yields every page index once. "spread" starts with the first and last pages and then
+    bisects the gaps between visited pages, so early pages are spread across the set.
+    """
+    if order == "sequential" or page_count <= 2:
+        yield from range(page_count)
+        return
+    yield 0
+    yield page_count - 1
+    gaps = deque([(0, page_count - 1)])
+    while gaps:
+        low, high = gaps.popleft()
+        if high - low < 2:
+            continue
+        middle = (low + high) // 2
+        yield middle
+        gaps.append((low, middle))
+        gaps.append((middle, high))
+
+
+def _title_block_lines(record: PageRecord) -> frozenset:
+    text = record.title_block or record.title_block_wide or ""
+    return frozenset(' '.join(line.split()).casefold() for line in text.split('\n') if line.strip())
+
+
+def _scan_metadata_pages(pdf, stable_pages: int, order: str, records: list, probe_pages: int | None = None) -> bool:
+    """
+    Appends page records of an open pdfplumber document to records in scan order and
+    stops once one title block (matched by shared lines, so sheet numbers and titles may
+    differ) has been seen on stable_pages pages. Without a stable title block every page
+    is read, or only the first probe_pages pages when that is set.
+    Returns whether a stable title block was found.
+    """
+    # [lines of the first page with this title block, pages seen with it]
+    title_blocks: list[list] = []
+    for index in metadata_scan_order(len(pdf.pages), order):
+        if probe_pages is not None and len(records) >= probe_pages:
+            return False
+        record = _extract_page_record(pdf.pages[index], True)
+        records.append(record)
+        lines = _title_block_lines(record)
+        if not lines:
+            continue
+        for title_block in title_blocks:
+            reference = title_block[0]
+            if len(lines & reference) >= PDF_TITLE_BLOCK_SIMILARITY * max(len(lines), len(reference)):
+                title_block[1] += 1
+                break
+        else:
+            title_block = [lines, 1]
+            title_blocks.append(title_block)
+        if title_block[1] >= stable_pages:
+            return True
+    return False
+
+
+def scan_document_metadata(
+    pdf_file: bytes | str,
+    stable_pages: int = PDF_TITLE_BLOCK_STABLE_PAGES,
+    order: str = PDF_METADATA_SCAN_ORDER,
+    workers: int | None = None,
+) -> ExtractedText:
+    """
+    Extracts just enough pages of the PDF to read its title block (see _scan_metadata_pages).
+    With more than one worker, a document of at least PDF_PARALLEL_MIN_PAGES pages whose
+    title block is not stable after PDF_METADATA_SCAN_PROBE_PAGES pages has its remaining
+    pages extracted on the process pool rather than one by one.
+    Records are returned in page order; page_count and pages_skipped report the rest.
+    """
+    workers = PDF_EXTRACTION_WORKERS if workers is None else workers
+    records = []
+    page_count = 0
+    unstable = False
+    try:
+        with open_pdf_stream(pdf_file) as stream, pdfplumber.open(stream) as pdf:
+            page_count = len(pdf.pages)
+            probe_pages = PDF_METADATA_SCAN_PROBE_PAGES if workers > 1 and page_count >= PDF_PARALLEL_MIN_PAGES else None
+            unstable = not _scan_metadata_pages(pdf, stable_pages, order, records, probe_pages) and probe_pages is not None
     except Exception as e:
         logger.warning(f"pdfplumber extraction failed: {e}")
+    if unstable and len(records) < page_count:
+        logger.info(f"No stable title block after {len(records)} pages, extracting the remaining pages in parallel")
+        scanned = frozenset(record.page_num - 1 for record in records)
+        try:
+            records.extend(_iter_pages_parallel(pdf_file, page_count, True, workers, skip=scanned))
+        except Exception as e:
+            logger.warning(f"Parallel page extraction unavailable, falling back to sequential extraction: {e}")
+            if isinstance(e, BrokenProcessPool):
+                _reset_page_pool()
+            # Resumes after the pages the pool already delivered
+            done = frozenset(record.page_num - 1 for record in records)
+            try:
+                records.extend(_iter_page_range(pdf_file, 0, None, True, skip=done))
+            except Exception as e:
+                logger.warning(f"pdfplumber extraction failed: {e}")
+    records.sort(key=lambda record: record.page_num)
+    document = ExtractedText(records, page_count=max(page_count, len(records)))
+    pages_scanned.inc(len(records))
+    pages_skipped.inc(document.pages_skipped)
+    if document.pages_skipped:
+        logger.info(f"Metadata scan read {len(records)} of {page_count} pages, skipped {document.pages_skipped}")
+    return document
+
+
+def extract_document_text(
+    pdf_file: bytes | str,
+    focus_bottom_right: bool = True,
+    workers: int | None = None,
+    metadata_scan: bool = False,
+) -> ExtractedText:
+    """
+    Extracts the page records of the uploaded PDF using pdfplumber.
+    Focuses on bottom-right corner (title block area) where project details are typically located.
+    With metadata_scan, stops once the title block is stable instead of reading every page.
+    Falls back to PyPDF2 when pdfplumber finds almost no text.
+    """
+    if metadata_scan:
+        document = scan_document_metadata(pdf_file, workers=workers)
+    else:
+        document = ExtractedText(list(iter_page_records(pdf_file, focus_bottom_right, workers)))
+    pages_extracted.inc(len(document.records))
+    metrics.trace_count("pages_extracted", len(document.records))
+    metrics.trace_count("pages_skipped", document.pages_skipped)
     
     # Fallback to PyPDF2 if needed
-    if len(full_text.strip()) < 100:
+    if len(document.full_text.strip()) < 100:
+        metrics.trace_note("text_path", "pypdf2_fallback")
         try:
-            pdf_reader = PyPDF2.PdfReader(BytesIO(pdf_file))
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    full_text += page_text + "\n"
+            with metrics.stage("pypdf2_fallback"), open_pdf_stream(pdf_file) as stream:
+                pdf_reader = PyPDF2.PdfReader(stream)
+                fallback_pages = [page_text for page_text in (page.extract_text() for page in pdf_reader.pages) if page_text]
+            document.add_fallback_pages(fallback_pages)
         except Exception as e:
             logger.warning(f"PyPDF2 extraction failed: {e}")
+    else:
+        metrics.trace_note("text_path", "pdfplumber")
     
-    return full_text, title_block_text
+    return document
+
+
+def extract_text_from_pdf(pdf_file: bytes | str, focus_bottom_right: bool = True, workers: int | None = None) -> tuple[str, str]:
+    """
+    Extracts text from the uploaded PDF using pdfplumber.
+    Focuses on bottom-right corner (title block area) where project details are typically located.
+    Returns full text and title block text separately.
+    """
+    document = extract_document_text(pdf_file, focus_bottom_right, workers)
+    return document.full_text, document.title_block_text
 
 
 def extract_json_from_text(text: str) -> dict | None:
@@ -200,22 +648,325 @@ def extract_json_from_text(text: str) -> dict | None:
         return result if result else None
 
 
-def extract_details_with_ollama(text: str, title_block_text: str = "", model: str = "llama3.1") -> dict:
+# Keys the prompts ask for, mapped to the response field each one fills.
+# The structured prompt uses the response field names themselves.
+PROMPT_FIELD_KEYS = {
+    **{field: field for field in PDFExtractionResponse.model_fields},
+    "Job Name": "job_name",
+    "Project": "job_name",
+    "Job No": "job_no",
+    "Drawing Number": "job_no",
+    "Professional Engineer Name": "professional_engineer_name",
+    "General Contractor Name": "general_contractor_name",
+    "Client": "general_contractor_name",
+    "Architect Name": "architect_name",
+    "Architect": "architect_name",
+    "Engineer Name": "engineer_name",
+    "Fabricator Name": "fabricator_name",
+    "Design Calculation": "design_calculation",
+    "Contract Drawings": "contract_drawings",
+    "Title": "contract_drawings",
+    "Standards": "standards",
+    "Detailer": "detailer",
+    "Detailing Country": "detailing_country",
+}
+TARGET_FIELD_COUNT = len(set(PROMPT_FIELD_KEYS.values()))
+
+# JSON schema the structured reply is constrained to: every field present, string or null
+EXTRACTION_RESPONSE_SCHEMA = PDFExtractionResponse.model_json_schema()
+EXTRACTION_RESPONSE_SCHEMA["required"] = list(PDFExtractionResponse.model_fields)
+
+STRUCTURED_FIELD_DESCRIPTIONS = {
+    "job_name": "Full project title",
+    "job_no": "Project or drawing number",
+    "professional_engineer_name": "Name of the PE stamping the drawings",
+    "general_contractor_name": "Construction company, client or owner",
+    "architect_name": "Architecture firm name",
+    "engineer_name": "Structural engineer name",
+    "fabricator_name": "Steel fabricator (if mentioned)",
+    "design_calculation": "Reference to calculations",
+    "contract_drawings": "Drawing set description or title",
+    "standards": "Codes/standards (e.g., AISC, ASTM, BS, IS, EN)",
+    "detailer": "Person/firm who detailed (from \"Drawn By\" or similar)",
+    "detailing_country": "Country name",
+}
+
+
+class StreamingJSONScanner:
     """
-    Uses local Ollama model to extract structured details from the PDF text.
-    Enhanced prompt with descriptions and example for better accuracy.
+    Incrementally parses the top-level members of a JSON object as text arrives.
+    Tracks string/escape state and nesting depth so each member is decoded once,
+    as soon as its closing delimiter has been seen. Anything before the first `{`
+    (prose, `[note]`) is skipped, and an object that closes without a single member
+    (e.g. `{}` in an explanation) is dropped and scanning goes on to the next one.
     """
-    if not ollama_available:
-        logger.warning("Ollama not available, using fallback pattern matching")
-        return extract_with_patterns(text)
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields: dict = {}
+        self.complete = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._key: str | None = None
+        self._value_start: int | None = None
+
+    def feed(self, chunk: str) -> list[tuple[str, object]]:
+        """Adds a chunk of model output and returns the members completed by it."""
+        self.buffer += chunk
+        completed = []
+        buffer = self.buffer
+        for i in range(self._pos, len(buffer)):
+            if self.complete:
+                break
+            ch = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._value_start is None:
+                        try:
+                            self._key = json.loads(buffer[self._string_start:i + 1])
+                        except json.JSONDecodeError:
+                            self._key = None
+                continue
+            if self._depth == 0:
+                # Outside the object: wait for it to open
+                if ch == '{':
+                    self._depth = 1
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in '{[':
+                self._depth += 1
+            elif ch == ':' and self._depth == 1 and self._key is not None and self._value_start is None:
+                self._value_start = i + 1
+            elif ch == ',' and self._depth == 1:
+                self._finish_member(i, completed)
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_member(i, completed)
+                    # An object without members is not the reply
+                    self.complete = bool(self.fields)
+        self._pos = len(buffer)
+        return completed
+
+    def _finish_member(self, end: int, completed: list) -> None:
+        if self._key is not None and self._value_start is not None:
+            try:
+                value = json.loads(self.buffer[self._value_start:end])
+            except json.JSONDecodeError:
+                value = None
+            else:
+                self.fields[self._key] = value
+                completed.append((self._key, value))
+        self._key = None
+        self._value_start = None
+
+
+def _record_token_counts(reply) -> None:
+    """Counts the prompt and generated tokens Ollama reports on a finished reply."""
+    prompt_tokens = reply.get('prompt_eval_count') or 0
+    generated_tokens = reply.get('eval_count') or 0
+    ollama_prompt_eval_tokens.inc(prompt_tokens)
+    ollama_eval_tokens.inc(generated_tokens)
+    metrics.trace_count("ollama_prompt_eval_tokens", prompt_tokens)
+    metrics.trace_count("ollama_eval_tokens", generated_tokens)
+
+
+def _chat_with_ollama(prompt: str, model: str, on_field=None, format: dict | None = None) -> tuple[str, dict | None]:
+    """
+    Sends the extraction prompt to Ollama and returns (raw reply, parsed members).
+    format is passed through to constrain the reply to a JSON schema.
+    In streaming mode the reply is parsed as it arrives and generation is cancelled as
+    soon as the JSON object closes or every target field has a value; on_field(key, value)
+    is called for each member as it completes. Parsed members are None when the
+    reply has to go through extract_json_from_text instead.
+    """
+    options = {
+        "temperature": 0.05,  # Very low for precision
+        "num_predict": 2000  # Increase token limit to prevent truncation
+    }
+    request = {"model": model, "messages": [{"role": "user", "content": prompt}], "options": options}
+    if format is not None:
+        request["format"] = format
+    
+    if not OLLAMA_STREAMING:
+        with metrics.stage("ollama_call"):
+            response = ollama_manager.chat(**request)
+        _record_token_counts(response)
+        return response['message']['content'], None
+    
+    scanner = StreamingJSONScanner()
+    filled_fields = set()
+    call_start = time.perf_counter()
+    stream = ollama_manager.chat_stream(**request)
+    try:
+        for chunk in stream:
+            if chunk.get('done'):
+                _record_token_counts(chunk)
+            for key, value in scanner.feed(chunk['message']['content']):
+                if value not in (None, "", []):
+                    field = PROMPT_FIELD_KEYS.get(key)
+                    if field:
+                        filled_fields.add(field)
+                if on_field:
+                    on_field(key, value)
+            if scanner.complete or len(filled_fields) == TARGET_FIELD_COUNT:
+                break
+    finally:
+        # Closing the stream drops the connection, which makes Ollama stop generating
+        stream.close()
+        metrics.record_stage("ollama_call", time.perf_counter() - call_start)
+    
+    if scanner.complete or len(filled_fields) == TARGET_FIELD_COUNT:
+        return scanner.buffer, scanner.fields
+    return scanner.buffer, None
+
+
+def _clean_extracted_values(mapped_details: dict) -> dict:
+    """Joins list values, turns placeholders into None and strips strings."""
+    for key, value in mapped_details.items():
+        if isinstance(value, list):
+            # If value is an array, join it
+            mapped_details[key] = ', '.join(str(v) for v in value) if value else None
+        elif value == "Not specified" or value == "Not provided" or not value:
+            mapped_details[key] = None
+        else:
+            # Clean string values
+            mapped_details[key] = str(value).strip() if value else None
+    return mapped_details
+
+
+def _extract_structured(extraction_text: str, model: str, on_field=None, fields: list[str] | None = None) -> dict | None:
+    """
+    Asks for JSON constrained to EXTRACTION_RESPONSE_SCHEMA, so the reply uses the
+    response field names and decodes with a single json.loads.
+    With fields, a shorter prompt and schema ask for just those fields.
+    Returns None when the reply is not valid JSON.
+    """
+    if fields is None:
+        schema = EXTRACTION_RESPONSE_SCHEMA
+        intro = (
+            "You are an expert in parsing architectural and engineering documents like steel framing plans. "
+            "These typically have a title block with job details at the bottom/right, architect info at bottom left, and revisions.\n\n"
+            "Extract these fields from the PDF text. Use null when a field is not found."
+        )
+    else:
+        schema = {
+            "type": "object",
+            "properties": {field: EXTRACTION_RESPONSE_SCHEMA["properties"][field] for field in fields},
+            "required": list(fields),
+        }
+        intro = (
+            "From the title block of this architectural/engineering drawing set, extract only these fields. "
+            "Copy values as written in the text; use null when a field is not present."
+        )
+    field_lines = "\n".join(
+        f'- "{field}": {description}'
+        for field, description in STRUCTURED_FIELD_DESCRIPTIONS.items()
+        if fields is None or field in fields
+    )
+    prompt = f"""
+{intro}
+
+{field_lines}
+
+PDF Text:
+
+{extraction_text}
+"""
+    raw, details = _chat_with_ollama(prompt, model, on_field, format=schema)
+    if details is None:
+        try:
+            with metrics.stage("json_decode"):
+                details = json.loads(raw)
+        except json.JSONDecodeError:
+            logger.error(f"Structured AI response was not valid JSON. Raw: {raw[:1000]}")
+            return None
+    if not isinstance(details, dict):
+        return None
+    return {field: details.get(field) for field in (fields or PDFExtractionResponse.model_fields)}
+
+
+_GROUNDING_TOKEN = re.compile(r'[a-z0-9]+')
+
+# Fields the model may legitimately infer rather than copy (e.g. the country from an address)
+_INFERRED_FIELDS = frozenset({"detailing_country"})
+
+
+def _is_grounded(value: str, source_tokens: set) -> bool:
+    """True when most words of the value appear in the text the model was given."""
+    tokens = _GROUNDING_TOKEN.findall(value.casefold())
+    if not tokens:
+        return False
+    found = sum(1 for token in tokens if token in source_tokens)
+    return found >= OLLAMA_CASCADE_GROUNDING * len(tokens)
+
+
+def _extract_cascade(extraction_text: str, model: str, on_field=None) -> dict | None:
+    """
+    Runs OLLAMA_FAST_MODEL over every field, then re-asks model for just the fields
+    that came back null or are not grounded in the text, and merges the answers.
+    on_field sees the fast tier's values first and then the large tier's corrections.
+    """
+    start = time.monotonic()
+    try:
+        fast_details = _extract_structured(extraction_text, OLLAMA_FAST_MODEL, on_field)
+    except Exception as e:
+        logger.warning(f"Fast tier ({OLLAMA_FAST_MODEL}) failed, escalating every field: {e}")
+        fast_details = None
+    finally:
+        cascade_fast_seconds.observe(time.monotonic() - start)
     
-    # Prioritize title block text if available
-    extraction_text = title_block_text if title_block_text.strip() else text
+    merged = _clean_extracted_values(fast_details) if fast_details else dict.fromkeys(PDFExtractionResponse.model_fields)
+    source_tokens = set(_GROUNDING_TOKEN.findall(extraction_text.casefold()))
+    missing = [
+        field for field, value in merged.items()
+        if value is None or (field not in _INFERRED_FIELDS and not _is_grounded(value, source_tokens))
+    ]
+    if not missing:
+        cascade_fast_resolved.inc()
+        return merged
     
-    # Limit text length for AI (use first 8000 chars to stay within context limits)
-    if len(extraction_text) > 8000:
-        extraction_text = extraction_text[:8000] + "\n[... text truncated ...]"
+    cascade_escalations.inc()
+    cascade_escalated_fields.inc(len(missing))
+    logger.info(f"Cascade escalating {len(missing)} fields to {model}: {missing}")
+    start = time.monotonic()
+    try:
+        large_details = _extract_structured(extraction_text, model, on_field, fields=missing)
+    except Exception as e:
+        if fast_details is None:
+            raise
+        logger.warning(f"Large tier ({model}) failed, keeping the fast tier's answer: {e}")
+        return merged
+    finally:
+        cascade_large_seconds.observe(time.monotonic() - start)
+    if large_details is None:
+        return merged if fast_details is not None else None
     
+    large_details = _clean_extracted_values(large_details)
+    for field in missing:
+        # A null from the large model also clears an ungrounded fast-tier value
+        merged[field] = large_details.get(field)
+        if merged[field] is not None:
+            cascade_large_filled_fields.inc()
+    return merged
+
+
+def _extract_legacy(extraction_text: str, model: str, on_field=None) -> dict | None:
+    """
+    Free-form JSON prompt used when OLLAMA_STRUCTURED_OUTPUT is off. The reply is
+    repaired by extract_json_from_text and regexes, then mapped from the various key
+    names models use. Returns None when nothing could be parsed.
+    """
     prompt = f"""
 You are an expert in parsing architectural and engineering documents like steel framing plans. These typically have a title block with job details at the bottom/right, architect info at bottom left, and revisions.
 
@@ -242,288 +993,674 @@ PDF Text:
 
 """
     
-    try:
-        client = ollama.Client(host=OLLAMA_BASE_URL)
-        response = client.chat(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            options={
-                "temperature": 0.05,  # Very low for precision
-                "num_predict": 2000  # Increase token limit to prevent truncation
-            }
-        )
-        
-        result = response['message']['content']
-        
-        details = extract_json_from_text(result)
-        if details is None:
-            logger.error(f"Failed to parse AI response. Raw: {result[:1000]}")
-            # Try pattern-based extraction from the raw result
-            logger.info("Attempting pattern-based extraction from raw response")
-            details = {}
-            # Extract key fields using regex
-            job_name_match = re.search(r'"Job Name"\s*:\s*"([^"]*)"', result, re.IGNORECASE)
-            if job_name_match:
-                details['Job Name'] = job_name_match.group(1)
-            project_match = re.search(r'"Project"\s*:\s*"([^"]*)"', result, re.IGNORECASE)
-            if project_match:
-                details['Project'] = project_match.group(1)
-            job_no_match = re.search(r'"Job No"\s*:\s*"([^"]*)"', result, re.IGNORECASE)
-            if job_no_match:
-                details['Job No'] = job_no_match.group(1)
-            drawing_num_match = re.search(r'"Drawing Number"\s*:\s*"([^"]*)"', result, re.IGNORECASE)
-            if drawing_num_match:
-                details['Drawing Number'] = drawing_num_match.group(1)
-            gc_match = re.search(r'"General Contractor Name"\s*:\s*"([^"]*)"', result, re.IGNORECASE)
-            if gc_match:
-                details['General Contractor Name'] = gc_match.group(1)
-            client_match = re.search(r'"Client"\s*:\s*"([^"]*)"', result, re.IGNORECASE)
-            if client_match:
-                details['Client'] = client_match.group(1)
-            architect_match = re.search(r'"Architect Name"\s*:\s*"([^"]*)"', result, re.IGNORECASE)
-            if architect_match:
-                details['Architect Name'] = architect_match.group(1)
-            location_match = re.search(r'"Location"\s*:\s*"([^"]*)"', result, re.IGNORECASE)
-            if location_match:
-                details['Location'] = location_match.group(1)
-            title_match = re.search(r'"Title"\s*:\s*"([^"]*)"', result, re.IGNORECASE)
-            if title_match:
-                details['Title'] = title_match.group(1)
-            
-            if not details:
-                # Fallback to pattern matching from original text
-                return extract_with_patterns(text)
-        
-        # Map AI response to our expected format
-        # Handle both numbered keys (1-12) and named keys from AI
-        mapped_details = {}
+    result, details = _chat_with_ollama(prompt, model, on_field)
+    
+    if not details:
+        metrics.trace_note("json_repair", True)
+        with metrics.stage("json_repair"):
+            details = extract_json_from_text(result) or None
+    if details is None:
+        logger.error(f"Failed to parse AI response. Raw: {result[:1000]}")
+        # Try pattern-based extraction from the raw result
+        logger.info("Attempting pattern-based extraction from raw response")
+        details = {}
+        # Extract key fields using regex
+        job_name_match = re.search(r'"Job Name"\s*:\s*"([^"]*)"', result, re.IGNORECASE)
+        if job_name_match:
+            details['Job Name'] = job_name_match.group(1)
+        project_match = re.search(r'"Project"\s*:\s*"([^"]*)"', result, re.IGNORECASE)
+        if project_match:
+            details['Project'] = project_match.group(1)
+        job_no_match = re.search(r'"Job No"\s*:\s*"([^"]*)"', result, re.IGNORECASE)
+        if job_no_match:
+            details['Job No'] = job_no_match.group(1)
+        drawing_num_match = re.search(r'"Drawing Number"\s*:\s*"([^"]*)"', result, re.IGNORECASE)
+        if drawing_num_match:
+            details['Drawing Number'] = drawing_num_match.group(1)
+        gc_match = re.search(r'"General Contractor Name"\s*:\s*"([^"]*)"', result, re.IGNORECASE)
+        if gc_match:
+            details['General Contractor Name'] = gc_match.group(1)
+        client_match = re.search(r'"Client"\s*:\s*"([^"]*)"', result, re.IGNORECASE)
+        if client_match:
+            details['Client'] = client_match.group(1)
+        architect_match = re.search(r'"Architect Name"\s*:\s*"([^"]*)"', result, re.IGNORECASE)
+        if architect_match:
+            details['Architect Name'] = architect_match.group(1)
+        location_match = re.search(r'"Location"\s*:\s*"([^"]*)"', result, re.IGNORECASE)
+        if location_match:
+            details['Location'] = location_match.group(1)
+        title_match = re.search(r'"Title"\s*:\s*"([^"]*)"', result, re.IGNORECASE)
+        if title_match:
+            details['Title'] = title_match.group(1)
         
-        # First, try numbered keys (1-12) format
-        if any(str(i) in details for i in range(1, 13)):
-            mapped_details = {
-                'job_name': details.get('1') or details.get('1', 'Not specified'),
-                'job_no': details.get('2') or details.get('2', 'Not specified'),
-                'professional_engineer_name': details.get('3') or details.get('3', 'Not specified'),
-                'general_contractor_name': details.get('4') or details.get('4', 'Not specified'),
-                'architect_name': details.get('5') or details.get('5', 'Not specified'),
-                'engineer_name': details.get('6') or details.get('6', 'Not specified'),
-                'fabricator_name': details.get('7') or details.get('7', 'Not specified'),
-                'design_calculation': details.get('8') or details.get('8', 'Not specified'),
-                'contract_drawings': details.get('9') or details.get('9', 'Not specified'),
-                'standards': details.get('10') or details.get('10', 'Not specified'),
-                'detailer': details.get('11') or details.get('11', 'Not specified'),
-                'detailing_country': details.get('12') or details.get('12', 'Not specified'),
-            }
+        if not details:
+            return None
+    
+    # Map AI response to our expected format
+    # Handle both numbered keys (1-12) and named keys from AI
+    mapped_details = {}
+    
+    # First, try numbered keys (1-12) format
+    if any(str(i) in details for i in range(1, 13)):
+        mapped_details = {
+            'job_name': details.get('1') or details.get('1', 'Not specified'),
+            'job_no': details.get('2') or details.get('2', 'Not specified'),
+            'professional_engineer_name': details.get('3') or details.get('3', 'Not specified'),
+            'general_contractor_name': details.get('4') or details.get('4', 'Not specified'),
+            'architect_name': details.get('5') or details.get('5', 'Not specified'),
+            'engineer_name': details.get('6') or details.get('6', 'Not specified'),
+            'fabricator_name': details.get('7') or details.get('7', 'Not specified'),
+            'design_calculation': details.get('8') or details.get('8', 'Not specified'),
+            'contract_drawings': details.get('9') or details.get('9', 'Not specified'),
+            'standards': details.get('10') or details.get('10', 'Not specified'),
+            'detailer': details.get('11') or details.get('11', 'Not specified'),
+            'detailing_country': details.get('12') or details.get('12', 'Not specified'),
+        }
+    else:
+        # Map from AI's natural field names to our format
+        # Handle various field name variations
+        mapped_details = {
+            'job_name': (
+                (details.get('Job Name') and details.get('Location') and f"{details.get('Job Name')}, {details.get('Location')}") or
+                details.get('Job Name') or 
+                details.get('Project') or 
+                details.get('Project Name') or 
+                details.get('job_name') or
+                'Not specified'
+            ),
+            'job_no': (
+                details.get('Job No') or 
+                details.get('Job Number') or 
+                details.get('Drawing Number') or 
+                details.get('Project Number') or
+                details.get('job_no') or
+                'Not specified'
+            ),
+            'professional_engineer_name': (
+                details.get('Professional Engineer') or 
+                details.get('P.E.') or 
+                details.get('PE') or
+                details.get('professional_engineer_name') or
+                'Not specified'
+            ),
+            'general_contractor_name': (
+                details.get('General Contractor') or 
+                details.get('GC') or 
+                details.get('Client') or
+                details.get('Owner') or
+                details.get('general_contractor_name') or
+                'Not specified'
+            ),
+            'architect_name': (
+                details.get('Architect') or 
+                details.get('Architectural Firm') or
+                details.get('architect_name') or
+                'Not specified'
+            ),
+            'engineer_name': (
+                details.get('Engineer') or 
+                details.get('Structural Engineer') or
+                details.get('engineer_name') or
+                'Not specified'
+            ),
+            'fabricator_name': (
+                details.get('Fabricator') or 
+                details.get('Steel Fabricator') or
+                details.get('fabricator_name') or
+                'Not specified'
+            ),
+            'design_calculation': (
+                details.get('Design Calculation') or 
+                details.get('Calculations') or
+                details.get('design_calculation') or
+                'Not specified'
+            ),
+            'contract_drawings': (
+                details.get('Contract Drawings') or 
+                details.get('Drawing Set') or 
+                details.get('Title') or  # Sometimes title contains drawing info
+                details.get('contract_drawings') or
+                'Not specified'
+            ),
+            'standards': (
+                details.get('Standards') or 
+                details.get('Code') or
+                details.get('standards') or
+                'Not specified'
+            ),
+            'detailer': (
+                details.get('Detailer') or 
+                details.get('Drawn By') or
+                details.get('detailer') or
+                'Not specified'
+            ),
+            'detailing_country': (
+                details.get('Detailing Country') or 
+                details.get('Country') or
+                details.get('Location') or
+                details.get('detailing_country') or
+                'Not specified'
+            ),
+        }
+    
+    return mapped_details
+
+
+def extract_details_with_ollama(document: ExtractedText, model: str = "llama3.1", fallback: bool = True, on_field=None) -> dict:
+    """
+    Uses local Ollama model to extract structured details from the PDF's page records.
+    By default the reply is constrained to the PDFExtractionResponse JSON schema; the
+    free-form prompt and its repair path remain behind OLLAMA_STRUCTURED_OUTPUT=false.
+    With OLLAMA_FAST_MODEL set, model is the large tier of a cascade (_extract_cascade).
+    on_field(key, value) receives each field as the model produces it (streaming mode only).
+    With fallback=False, failures raise OllamaExtractionError instead of returning
+    pattern-matched results, so callers can tell the two apart.
+    """
+    if not ollama_manager.available:
+        if not fallback:
+            raise OllamaExtractionError("Ollama not available")
+        logger.warning("Ollama not available, using fallback pattern matching")
+        return _pattern_fallback(document)
+    
+    # Deduplicated, ranked lines (title block first) packed into the prompt token budget
+    with metrics.stage("prompt_build"):
+        context = build_prompt_context(document.iter_lines("title_block"), document.iter_lines())
+    extraction_text = context.text
+    metrics.trace_count("prompt_tokens", context.tokens_after)
+    metrics.trace_count("prompt_tokens_saved", context.tokens_saved)
+    logger.info(
+        f"Prompt context: {context.lines_kept}/{context.lines_unique} unique lines, "
+        f"~{context.tokens_after} tokens ({context.tokens_saved} saved)"
+    )
+    
+    try:
+        if OLLAMA_FAST_MODEL and OLLAMA_FAST_MODEL != model:
+            metrics.trace_note("llm_path", "cascade")
+            mapped_details = _extract_cascade(extraction_text, model, on_field)
+        elif OLLAMA_STRUCTURED_OUTPUT:
+            metrics.trace_note("llm_path", "structured")
+            mapped_details = _extract_structured(extraction_text, model, on_field)
         else:
-            # Map from AI's natural field names to our format
-            # Handle various field name variations
-            mapped_details = {
-                'job_name': (
-                    (details.get('Job Name') and details.get('Location') and f"{details.get('Job Name')}, {details.get('Location')}") or
-                    details.get('Job Name') or 
-                    details.get('Project') or 
-                    details.get('Project Name') or 
-                    details.get('job_name') or
-                    'Not specified'
-                ),
-                'job_no': (
-                    details.get('Job No') or 
-                    details.get('Job Number') or 
-                    details.get('Drawing Number') or 
-                    details.get('Project Number') or
-                    details.get('job_no') or
-                    'Not specified'
-                ),
-                'professional_engineer_name': (
-                    details.get('Professional Engineer') or 
-                    details.get('P.E.') or 
-                    details.get('PE') or
-                    details.get('professional_engineer_name') or
-                    'Not specified'
-                ),
-                'general_contractor_name': (
-                    details.get('General Contractor') or 
-                    details.get('GC') or 
-                    details.get('Client') or
-                    details.get('Owner') or
-                    details.get('general_contractor_name') or
-                    'Not specified'
-                ),
-                'architect_name': (
-                    details.get('Architect') or 
-                    details.get('Architectural Firm') or
-                    details.get('architect_name') or
-                    'Not specified'
-                ),
-                'engineer_name': (
-                    details.get('Engineer') or 
-                    details.get('Structural Engineer') or
-                    details.get('engineer_name') or
-                    'Not specified'
-                ),
-                'fabricator_name': (
-                    details.get('Fabricator') or 
-                    details.get('Steel Fabricator') or
-                    details.get('fabricator_name') or
-                    'Not specified'
-                ),
-                'design_calculation': (
-                    details.get('Design Calculation') or 
-                    details.get('Calculations') or
-                    details.get('design_calculation') or
-                    'Not specified'
-                ),
-                'contract_drawings': (
-                    details.get('Contract Drawings') or 
-                    details.get('Drawing Set') or 
-                    details.get('Title') or  # Sometimes title contains drawing info
-                    details.get('contract_drawings') or
-                    'Not specified'
-                ),
-                'standards': (
-                    details.get('Standards') or 
-                    details.get('Code') or
-                    details.get('standards') or
-                    'Not specified'
-                ),
-                'detailer': (
-                    details.get('Detailer') or 
-                    details.get('Drawn By') or
-                    details.get('detailer') or
-                    'Not specified'
-                ),
-                'detailing_country': (
-                    details.get('Detailing Country') or 
-                    details.get('Country') or
-                    details.get('Location') or
-                    details.get('detailing_country') or
-                    'Not specified'
-                ),
-            }
+            metrics.trace_note("llm_path", "legacy")
+            mapped_details = _extract_legacy(extraction_text, model, on_field)
         
-        # Clean up values - handle arrays, remove "Not specified"
-        for key, value in mapped_details.items():
-            if isinstance(value, list):
-                # If value is an array, join it
-                mapped_details[key] = ', '.join(str(v) for v in value) if value else None
-            elif value == "Not specified" or value == "Not provided" or not value:
-                mapped_details[key] = None
-            else:
-                # Clean string values
-                mapped_details[key] = str(value).strip() if value else None
+        if mapped_details is None:
+            if not fallback:
+                raise OllamaExtractionError("Could not parse AI response")
+            return _pattern_fallback(document)
         
+        mapped_details = _clean_extracted_values(mapped_details)
+        if not any(value is not None for value in mapped_details.values()):
+            # An empty reply is a failed parse, not an answer
+            if not fallback:
+                raise OllamaExtractionError("AI response had no field values")
+            return _pattern_fallback(document)
         logger.info(f"AI extraction successful: {mapped_details}")
         return mapped_details
     
+    except OllamaExtractionError:
+        raise
     except Exception as e:
         logger.error(f"Ollama AI extraction failed: {e}", exc_info=True)
-        # Fallback to pattern matching
-        return extract_with_patterns(text)
+        if not fallback:
+            raise OllamaExtractionError(str(e)) from e
+        return _pattern_fallback(document)
 
 
-def extract_with_patterns(text: str) -> dict:
-    """Fallback pattern-based extraction when AI is not available"""
+# Simple label-based extraction: labels per field, in priority order
+PATTERN_LABELS = {
+    'job_name': ['Job Name', 'Project Name', 'Project Title', 'Building Name'],
+    'job_no': ['Job No', 'Job Number', 'Project No', 'Project Number', 'Job #', 'Project #'],
+    'professional_engineer_name': ['Professional Engineer', 'P.E.', 'PE', 'Engineer of Record', 'EOR'],
+    'general_contractor_name': ['General Contractor', 'GC', 'Prime Contractor', 'Main Contractor'],
+    'architect_name': ['Architect', 'Architectural Firm', 'Ar.', 'Architect of Record', 'AOR'],
+    'engineer_name': ['Structural Engineer', 'Engineer', 'SE', 'Engineering Firm'],
+    'fabricator_name': ['Fabricator', 'Steel Fabricator', 'Fabrication Company'],
+    'design_calculation': ['Design Calculation', 'Design Calcs', 'Calculations'],
+    'contract_drawings': ['Contract Drawings', 'Drawing Set', 'Drawings'],
+    'standards': ['Standards', 'Code', 'Design Code'],
+    'detailer': ['Detailer', 'Detailing Company', 'Detailing Firm'],
+    'detailing_country': ['Detailing Country', 'Country', 'Location'],
+}
+
+# label (lowercase) -> field; the first field listing a label owns it
+_LABEL_FIELDS = {}
+for _field, _labels in PATTERN_LABELS.items():
+    for _label in _labels:
+        _LABEL_FIELDS.setdefault(_label.lower(), _field)
+
+# One alternation over every label, longest first so "Structural Engineer" wins over
+# "Engineer". A label must not be glued to a preceding letter or digit ("TYPE" is not "PE").
+_LABEL_SCANNER = re.compile(
+    r'(?<![A-Za-z0-9])(?P<label>'
+    + '|'.join(re.escape(label) for label in sorted(_LABEL_FIELDS, key=len, reverse=True))
+    + r')(?P<sep>\s*:\s*|\s+)',
+    re.IGNORECASE,
+)
+
+# Only skip the model when every required field was read with at least this confidence
+PATTERN_FAST_PATH = os.getenv("PATTERN_FAST_PATH", "true").lower() in ("1", "true", "yes")
+PATTERN_FAST_PATH_THRESHOLD = float(os.getenv("PATTERN_FAST_PATH_THRESHOLD", "0.9"))
+PATTERN_FAST_PATH_MIN_CONFIDENCE = float(os.getenv("PATTERN_FAST_PATH_MIN_CONFIDENCE", "0.6"))
+# Cap for values cut off at a comma, which may be only part of the real value
+_TRUNCATED_CONFIDENCE = round(min(PATTERN_FAST_PATH_THRESHOLD, PATTERN_FAST_PATH_MIN_CONFIDENCE) - 0.1, 2)
+PATTERN_FAST_PATH_FIELDS = [
+    f.strip() for f in os.getenv(
+        "PATTERN_FAST_PATH_FIELDS", "job_name,job_no,general_contractor_name,architect_name"
+    ).split(",") if f.strip()
+]
+
+
+def _label_confidence(label: str, separator: str, value: str, at_line_start: bool) -> float:
+    """Scores how likely a label/value pair is a real title block entry."""
+    confidence = 0.9 if ':' in separator else 0.5
+    if at_line_start:
+        confidence += 0.1
+    # Short labels ("PE", "GC", "Ar.") also occur as ordinary words and abbreviations
+    if len(label.strip('.#')) <= 3:
+        confidence -= 0.3
+    # Long values or values with their own label are probably running notes text
+    if len(value) > 60 or ':' in value:
+        confidence -= 0.2
+    return round(max(0.0, min(confidence, 1.0)), 2)
+
+
+def extract_with_patterns_scored(text: str | Iterable[str]) -> tuple[dict, dict]:
+    """
+    Pattern-based extraction with a confidence (0-1) per field.
+    Takes a string or an iterable of lines (e.g. ExtractedText.iter_lines()).
+    Scans every line once with a single precompiled regex covering all labels. A value
+    runs to the next "Label:" or the end of the line; after a label without a colon it
+    also stops at a comma, and such a possibly truncated value is never confident
+    enough for the fast path. For each field the most confident value wins, earlier
+    lines breaking ties.
+    Returns (fields, confidences).
+    """
     result = {}
-    normalized_text = text.replace('\n', ' ').replace('\r', ' ')
-    normalized_text = ' '.join(normalized_text.split())
-    lines = [line.strip() for line in text.split('\n') if line.strip()]
-    
-    # Simple label-based extraction
-    label_mappings = {
-        'job_name': ['Job Name', 'Project Name', 'Project Title', 'Building Name'],
-        'job_no': ['Job No', 'Job Number', 'Project No', 'Project Number', 'Job #', 'Project #'],
-        'professional_engineer_name': ['Professional Engineer', 'P.E.', 'PE', 'Engineer of Record', 'EOR'],
-        'general_contractor_name': ['General Contractor', 'GC', 'Prime Contractor', 'Main Contractor'],
-        'architect_name': ['Architect', 'Architectural Firm', 'Ar.', 'Architect of Record', 'AOR'],
-        'engineer_name': ['Structural Engineer', 'Engineer', 'SE', 'Engineering Firm'],
-        'fabricator_name': ['Fabricator', 'Steel Fabricator', 'Fabrication Company'],
-        'design_calculation': ['Design Calculation', 'Design Calcs', 'Calculations'],
-        'contract_drawings': ['Contract Drawings', 'Drawing Set', 'Drawings'],
-        'standards': ['Standards', 'Code', 'Design Code'],
-        'detailer': ['Detailer', 'Detailing Company', 'Detailing Firm'],
-        'detailing_country': ['Detailing Country', 'Country', 'Location'],
-    }
+    confidence = {}
     
-    for field, labels in label_mappings.items():
-        for line in lines:
-            for label in labels:
-                if label.lower() in line.lower():
-                    # Extract value after label
-                    pattern = rf'{re.escape(label)}[:\s]+([^\n\r,]+?)(?:\n|$|,)'
-                    match = re.search(pattern, line, re.IGNORECASE)
-                    if match:
-                        value = match.group(1).strip().strip('.,;:')
-                        if value and len(value) > 2:
-                            result[field] = value
-                            break
-            if field in result:
-                break
+    lines = text.split('\n') if isinstance(text, str) else text
+    for raw_line in lines:
+        line = raw_line.strip()
+        if not line:
+            continue
+        matches = list(_LABEL_SCANNER.finditer(line))
+        if not matches:
+            continue
+        # A value stops where the next explicit "Label:" begins
+        colon_starts = [m.start() for m in matches if ':' in m.group('sep')]
+        for match in matches:
+            field = _LABEL_FIELDS[match.group('label').lower()]
+            colon = ':' in match.group('sep')
+            value_start = match.end()
+            value_end = len(line)
+            # Labelled values may contain commas ("Pei, Cobb, Freed & Partners")
+            comma = -1 if colon else line.find(',', value_start)
+            if comma != -1:
+                value_end = comma
+            for start in colon_starts:
+                if value_start < start < value_end:
+                    value_end = start
+                    break
+            value = line[value_start:value_end].strip().strip('.,;:')
+            if not value or len(value) <= 2:
+                continue
+            score = _label_confidence(match.group('label'), match.group('sep'), value, match.start() == 0)
+            if value_end == comma:
+                score = min(score, _TRUNCATED_CONFIDENCE)
+            if score > confidence.get(field, -1):
+                result[field] = value
+                confidence[field] = score
     
+    return result, confidence
+
+
+def extract_with_patterns(text: str | Iterable[str]) -> dict:
+    """Fallback pattern-based extraction when AI is not available"""
+    result, _ = extract_with_patterns_scored(text)
     return result
 
 
+class PatternFallbackFields(dict):
+    """Fields read by pattern matching because the model could not be used."""
+
+
+def _pattern_fallback(document: ExtractedText) -> PatternFallbackFields:
+    """Pattern-matched fields standing in for the model's answer."""
+    metrics.trace_note("fields_source", "pattern_fallback")
+    return PatternFallbackFields(extract_with_patterns(document.iter_lines()))
+
+
+def try_pattern_fast_path(document: ExtractedText) -> dict | None:
+    """
+    Returns the pattern-extracted fields when every PATTERN_FAST_PATH_FIELDS field was
+    read with at least PATTERN_FAST_PATH_THRESHOLD confidence, so the model can be skipped.
+    Title block lines are scanned first, so they win ties with the rest of the page.
+    """
+    if not PATTERN_FAST_PATH:
+        return None
+    fields, confidence = extract_with_patterns_scored(
+        chain(document.iter_lines("title_block"), document.iter_lines())
+    )
+    if all(confidence.get(f, 0) >= PATTERN_FAST_PATH_THRESHOLD for f in PATTERN_FAST_PATH_FIELDS):
+        logger.info(f"Pattern fast path hit, skipping AI extraction (confidence: {confidence})")
+        # Optional fields are only kept when they are reasonably certain, too
+        return {f: v for f, v in fields.items() if confidence[f] >= PATTERN_FAST_PATH_MIN_CONFIDENCE}
+    return None
+
+
+def get_pdf_text(
+    pdf_source: bytes | str,
+    content_hash: str,
+    preflight: bool = True,
+    metadata_scan: bool = PDF_METADATA_SCAN,
+) -> ExtractedText:
+    """
+    Returns the PDF's page records, served from the extraction cache when possible.
+    Before a full parse, a structural pre-flight check rejects image-only and encrypted
+    PDFs with a 400 in milliseconds (unless preflight is False). metadata_scan stops at
+    the stable title block; metadata and full extractions are cached separately.
+    """
+    variant = f"{TEXT_EXTRACTION_VERSION}:{'metadata' if metadata_scan else 'full'}"
+    if EXTRACTION_CACHE_ENABLED:
+        cached = extraction_cache.get_text(content_hash, variant)
+        if cached is not None:
+            logger.info(f"Extraction cache hit for text of {content_hash[:12]}")
+            metrics.trace_note("text_path", "cache")
+            return ExtractedText.from_dict(cached)
+    
+    if preflight and PDF_PREFLIGHT_ENABLED:
+        with metrics.stage("preflight"):
+            preflight_result = classify_pdf(pdf_source)
+        if preflight_result["classification"] in ("image_only", "encrypted"):
+            logger.info(f"Pre-flight rejected {content_hash[:12]}: {preflight_result}")
+            raise HTTPException(status_code=400, detail=INSUFFICIENT_TEXT_DETAIL)
+    
+    # Extract text from PDF (focus on bottom-right title block)
+    document = extract_document_text(pdf_source, focus_bottom_right=True, metadata_scan=metadata_scan)
+    
+    if EXTRACTION_CACHE_ENABLED and (document.records or document.fallback_pages):
+        extraction_cache.put_text(content_hash, document.to_dict(), variant)
+    return document
+
+
+def get_extracted_fields(content_hash: str, document: ExtractedText, on_field=None) -> dict:
+    """
+    Returns the mapped extraction fields. Unambiguous title blocks are read by the pattern
+    fast path without calling the model; otherwise results are served from the extraction
+    cache when possible. Only successful AI extractions are cached; pattern-matching
+    fallbacks are recomputed so a later request can still get the model's answer.
+    """
+    with metrics.stage("pattern_fast_path"):
+        fast_path_fields = try_pattern_fast_path(document)
+    if fast_path_fields is not None:
+        metrics.trace_note("fields_source", "pattern_fast_path")
+        return fast_path_fields
+    
+    metrics.trace_note("fields_source", "ollama")
+    if not EXTRACTION_CACHE_ENABLED:
+        return extract_details_with_ollama(document, OLLAMA_MODEL, on_field=on_field)
+    
+    cached = extraction_cache.get_fields(content_hash, EXTRACTION_MODEL_KEY, PROMPT_VERSION)
+    if cached is not None:
+        logger.info(f"Extraction cache hit for fields of {content_hash[:12]}")
+        metrics.trace_note("fields_source", "cache")
+        return cached
+    
+    try:
+        extracted_data = extract_details_with_ollama(document, OLLAMA_MODEL, fallback=False, on_field=on_field)
+    except OllamaExtractionError as e:
+        logger.warning(f"AI extraction unavailable ({e}), using fallback pattern matching")
+        return _pattern_fallback(document)
+    
+    # Never cache an empty answer; a later request should ask the model again
+    if any(value is not None for value in extracted_data.values()):
+        extraction_cache.put_fields(content_hash, EXTRACTION_MODEL_KEY, PROMPT_VERSION, extracted_data)
+    return extracted_data
+
+
+def build_extraction_response(extracted_data: dict) -> PDFExtractionResponse:
+    """Maps extracted fields to the response model, noting whether they are a pattern fallback."""
+    response = PDFExtractionResponse(
+        job_name=extracted_data.get('job_name'),
+        job_no=extracted_data.get('job_no'),
+        professional_engineer_name=extracted_data.get('professional_engineer_name'),
+        general_contractor_name=extracted_data.get('general_contractor_name'),
+        architect_name=extracted_data.get('architect_name'),
+        engineer_name=extracted_data.get('engineer_name'),
+        fabricator_name=extracted_data.get('fabricator_name'),
+        design_calculation=extracted_data.get('design_calculation'),
+        contract_drawings=extracted_data.get('contract_drawings'),
+        standards=extracted_data.get('standards'),
+        detailer=extracted_data.get('detailer'),
+        detailing_country=extracted_data.get('detailing_country'),
+    )
+    response._pattern_fallback = isinstance(extracted_data, PatternFallbackFields)
+    return response
+
+
+def run_parse_stage(pdf: SpooledPDF) -> tuple[str, ExtractedText]:
+    """
+    Blocking parse stage: extracts the page records of a spooled upload.
+    Returns (content_hash, document) for run_llm_stage.
+    """
+    content_hash = pdf.sha256
+    pdf_bytes_parsed.inc(pdf.size)
+    with metrics.stage("parse"):
+        document = get_pdf_text(pdf.source, content_hash)
+    
+    full_text = document.full_text
+    if not full_text or len(full_text.strip()) < 50:
+        raise HTTPException(status_code=400, detail=INSUFFICIENT_TEXT_DETAIL)
+    
+    logger.info(f"Extracted {len(full_text)} chars from {len(document.records)} of {document.page_count} pages")
+    return content_hash, document
+
+
+def run_llm_stage(content_hash: str, document: ExtractedText, on_field=None) -> PDFExtractionResponse:
+    """Blocking LLM stage: extracts structured data and maps it to the response model."""
+    with metrics.stage("llm"):
+        extracted_data = get_extracted_fields(content_hash, document, on_field)
+    response = build_extraction_response(extracted_data)
+    logger.info(f"Final extraction response: {response}")
+    return response
+
+
+# Both stages run on a thread pool with separate concurrency limits, so a large PDF
+# or a slow model call never blocks the event loop. Concurrent requests for the same
+# PDF and model share one extraction.
+extraction_jobs = ExtractionJobManager(
+    run_parse_stage,
+    run_llm_stage,
+    key_fn=lambda pdf: (pdf.sha256, EXTRACTION_MODEL_KEY, PROMPT_VERSION),
+)
+
+
 @router.post("", response_model=PDFExtractionResponse)
 async def extract_pdf_data(file: UploadFile = File(...)):
     """Extract project information from uploaded PDF using AI"""
-    if not file.filename or not file.filename.lower().endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+    pdf = await ingest_pdf_upload(file)
     
     try:
-        # Read PDF file
-        pdf_bytes = await file.read()
-        if len(pdf_bytes) == 0:
-            raise HTTPException(status_code=400, detail="Empty PDF file")
-        
-        # Extract text from PDF (focus on bottom-right title block)
-        full_text, title_block_text = extract_text_from_pdf(pdf_bytes, focus_bottom_right=True)
-        
-        if not full_text or len(full_text.strip()) < 50:
-            raise HTTPException(
-                status_code=400, 
-                detail="Could not extract sufficient text from PDF. The PDF might be image-based or encrypted. Please ensure the PDF contains selectable text."
-            )
-        
-        logger.info(f"Extracted {len(full_text)} chars from full text, {len(title_block_text)} chars from title block")
-        
-        # Extract structured data using AI
-        extracted_data = extract_details_with_ollama(full_text, title_block_text, OLLAMA_MODEL)
-        
-        # Map to response format
-        response = PDFExtractionResponse(
-            job_name=extracted_data.get('job_name'),
-            job_no=extracted_data.get('job_no'),
-            professional_engineer_name=extracted_data.get('professional_engineer_name'),
-            general_contractor_name=extracted_data.get('general_contractor_name'),
-            architect_name=extracted_data.get('architect_name'),
-            engineer_name=extracted_data.get('engineer_name'),
-            fabricator_name=extracted_data.get('fabricator_name'),
-            design_calculation=extracted_data.get('design_calculation'),
-            contract_drawings=extracted_data.get('contract_drawings'),
-            standards=extracted_data.get('standards'),
-            detailer=extracted_data.get('detailer'),
-            detailing_country=extracted_data.get('detailing_country'),
-        )
-        
-        logger.info(f"Final extraction response: {response}")
-        
-        return response
+        return await extraction_jobs.process(pdf)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error processing PDF: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
+    finally:
+        pdf.close()
+
+
+async def _extract_batch_item(index: int, filename: str, pdf: SpooledPDF | None, error: HTTPException | None) -> dict:
+    """Runs one batch file through both stages and returns its NDJSON record."""
+    item = {"index": index, "filename": filename}
+    if error:
+        return {**item, "status": "failed", "error": {"status_code": error.status_code, "detail": error.detail}}
+    try:
+        # Batch files are spooled to disk up front; memory is only reserved when a file's
+        # turn comes, and a file waits for it rather than failing behind its own batch
+        await pdf.reserve(wait=True)
+        result = await extraction_jobs.process(pdf)
+        return {**item, "status": "completed", "result": result.model_dump()}
+    except HTTPException as e:
+        return {**item, "status": "failed", "error": {"status_code": e.status_code, "detail": e.detail}}
+    except Exception as e:
+        logger.error(f"Error processing PDF {filename}: {str(e)}", exc_info=True)
+        return {**item, "status": "failed", "error": {"status_code": 500, "detail": f"Error processing PDF: {str(e)}"}}
+    finally:
+        pdf.close()
+
+
+async def _stream_batch_results(items: list[tuple[int, str, SpooledPDF | None, HTTPException | None]]):
+    """
+    Starts every file at once and yields each record as soon as it is ready.
+    The parse and LLM stage limits turn this into a pipeline: while the model works
+    on one file, the next file's text is already being extracted.
+    """
+    tasks = [asyncio.create_task(_extract_batch_item(*item)) for item in items]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            record = await next_done
+            yield json.dumps(record) + "\n"
+    finally:
+        # Client went away: stop the files that have not started yet
+        for task in tasks:
+            task.cancel()
+        for _, _, pdf, _ in items:
+            if pdf:
+                pdf.close()
+
+
+@router.post("/batch")
+async def extract_pdf_batch(files: list[UploadFile] = File(...)):
+    """
+    Extract project information from many PDFs in one request.
+    Streams one NDJSON record per file, in completion order, as soon as it is ready.
+    Each record has index, filename, status and either result or error.
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files provided")
+    if len(files) > PDF_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {PDF_BATCH_MAX_FILES} files per batch")
+    
+    # Spool uploads before streaming starts; the request's files are closed once the handler returns
+    items = []
+    for index, file in enumerate(files):
+        filename = file.filename or f"file_{index}"
+        try:
+            items.append((index, filename, await ingest_pdf_upload(file, defer_reservation=True), None))
+        except HTTPException as e:
+            items.append((index, filename, None, e))
+    
+    return StreamingResponse(_stream_batch_results(items), media_type="application/x-ndjson")
+
+
+def _sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _stream_extraction_events(pdf: SpooledPDF):
+    """
+    Yields server-sent events for one extraction: a "field" event for each field as the
+    model produces it, then a final "result" (or "error") event with the full response.
+    """
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    
+    def on_field(key, value):
+        # Called from the LLM stage thread
+        event = {"key": key, "field": PROMPT_FIELD_KEYS.get(key), "value": value}
+        loop.call_soon_threadsafe(events.put_nowait, ("field", event))
+    
+    async def run():
+        try:
+            parsed = await extraction_jobs.run_parse(pdf)
+            response = await extraction_jobs.run_llm(*parsed, on_field)
+            await events.put(("result", response.model_dump()))
+        except HTTPException as e:
+            await events.put(("error", {"status_code": e.status_code, "detail": e.detail}))
+        except Exception as e:
+            logger.error(f"Error processing PDF: {str(e)}", exc_info=True)
+            await events.put(("error", {"status_code": 500, "detail": f"Error processing PDF: {str(e)}"}))
+        finally:
+            pdf.close()
+    
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            event, data = await events.get()
+            yield _sse_event(event, data)
+            if event in ("result", "error"):
+                break
+    finally:
+        task.cancel()
+        pdf.close()
+
+
+@router.post("/stream")
+async def stream_pdf_extraction(file: UploadFile = File(...)):
+    """Extract project information and stream partial fields to the client over SSE"""
+    pdf = await ingest_pdf_upload(file)
+    return StreamingResponse(
+        _stream_extraction_events(pdf),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@router.post("/jobs", status_code=202)
+async def submit_extraction_job(file: UploadFile = File(...)):
+    """Queue a PDF for extraction and return a job id to poll"""
+    pdf = await ingest_pdf_upload(file)
+    try:
+        job = await extraction_jobs.submit(pdf, file.filename)
+    except HTTPException:
+        pdf.close()
+        raise
+    return {"job_id": job.id, "status": job.status}
+
+
+@router.get("/jobs/metrics")
+def extraction_job_metrics():
+    """Queue depth, wait times and stage limits of the extraction job queue"""
+    return extraction_jobs.stats()
+
+
+@router.get("/jobs/{job_id}")
+async def get_extraction_job(job_id: str, wait: float = Query(0, ge=0, le=60)):
+    """Get job status and result; pass wait=<seconds> to long-poll until the job finishes"""
+    job = extraction_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job = await extraction_jobs.wait(job, wait)
+    return job.to_dict()
+
+
+def _run_debug_extraction(pdf: SpooledPDF, trace: metrics.Trace) -> tuple[dict, ExtractedText, dict]:
+    """Blocking part of the debug endpoint: every page, no cache shortcuts for the text."""
+    with trace.activate():
+        metrics.trace_count("pdf_bytes", pdf.size)
+        with metrics.stage("preflight"):
+            preflight_result = classify_pdf(pdf.source)
+        with metrics.stage("parse"):
+            document = get_pdf_text(pdf.source, pdf.sha256, False, False)
+        with metrics.stage("llm"):
+            extracted_data = get_extracted_fields(pdf.sha256, document)
+    return preflight_result, document, extracted_data
 
 
 @router.post("/debug")
-async def debug_extraction(file: UploadFile = File(...)):
-    """Debug endpoint to see what text is extracted from PDF"""
-    if not file.filename or not file.filename.lower().endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+async def debug_extraction(file: UploadFile = File(...), trace: bool = Query(False)):
+    """Debug endpoint to see what text is extracted from PDF. trace=true adds stage timings and the path taken."""
+    pdf = await ingest_pdf_upload(file)
     
     try:
-        pdf_bytes = await file.read()
-        full_text, title_block_text = extract_text_from_pdf(pdf_bytes, focus_bottom_right=True)
-        extracted_data = extract_details_with_ollama(full_text, title_block_text, OLLAMA_MODEL)
+        content_hash = pdf.sha256
+        request_trace = metrics.Trace()
+        preflight_result, document, extracted_data = await run_in_threadpool(_run_debug_extraction, pdf, request_trace)
+        full_text = document.full_text
+        title_block_text = document.title_block_text
         
         return {
             "full_text_preview": full_text[:2000] if full_text else "No text extracted",
@@ -531,11 +1668,34 @@ async def debug_extraction(file: UploadFile = File(...)):
             "full_text_length": len(full_text) if full_text else 0,
             "title_block_length": len(title_block_text) if title_block_text else 0,
             "extracted_data": extracted_data,
-            "first_10_lines_full": full_text.split('\n')[:10] if full_text else [],
-            "first_10_lines_title_block": title_block_text.split('\n')[:10] if title_block_text else [],
-            "ollama_available": ollama_available,
-            "ollama_model": OLLAMA_MODEL if ollama_available else None
+            "first_10_lines_full": list(islice(document.iter_lines(), 10)),
+            "first_10_lines_title_block": list(islice(document.iter_lines("title_block"), 10)),
+            "pages": document.page_count,
+            "pages_skipped": document.pages_skipped,
+            "ollama_available": ollama_manager.available,
+            "ollama_model": OLLAMA_MODEL if ollama_manager.available else None,
+            "content_hash": content_hash,
+            "preflight": preflight_result,
+            "prompt_context": build_prompt_context(document.iter_lines("title_block"), document.iter_lines()).to_dict(),
+            **({"trace": request_trace.to_dict()} if trace else {}),
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    finally:
+        pdf.close()
 
+
+@router.get("/cache")
+def extraction_cache_stats():
+    """Hit/miss counters and size of the extraction cache"""
+    return extraction_cache.stats()
+
+
+@router.get("/ollama")
+def ollama_status():
+    """Ollama availability, warm-up state, model call latency and cascade tier metrics"""
+    return {
+        **ollama_manager.status(),
+        "fast_model": OLLAMA_FAST_MODEL or None,
+        **metrics.snapshot("extraction_cascade"),
+    }
@@ -0,0 +1,240 @@
+import os
+import mmap
+import asyncio
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from io import BytesIO
+from typing import BinaryIO, Iterator
+
+from fastapi import UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+
+from . import metrics
+
+load_dotenv()
+
+# Uploads up to this size are kept in memory; larger ones are spooled to a temp file
+PDF_SPOOL_MAX_MEMORY = int(os.getenv("PDF_SPOOL_MAX_MEMORY", str(8 * 1024 * 1024)))
+PDF_SPOOL_DIR = os.getenv("PDF_SPOOL_DIR") or None
+PDF_SPOOL_CHUNK_SIZE = 1024 * 1024
+# Largest PDF a single extraction request may submit
+PDF_MAX_REQUEST_BYTES = int(os.getenv("PDF_MAX_REQUEST_BYTES", str(512 * 1024 * 1024)))
+# Total size of PDFs being extracted at once; further requests wait for room
+PDF_MAX_INFLIGHT_BYTES = int(os.getenv("PDF_MAX_INFLIGHT_BYTES", str(1024 * 1024 * 1024)))
+PDF_INFLIGHT_WAIT_SECONDS = float(os.getenv("PDF_INFLIGHT_WAIT_SECONDS", "30"))
+
+inflight_bytes_gauge = metrics.gauge("pdf_inflight_bytes", "Bytes of PDFs currently held for extraction")
+inflight_rejections = metrics.counter("pdf_inflight_rejections_total", "Extractions rejected while waiting for the in-flight byte budget")
+
+
+class InflightBytes:
+    """
+    Global budget for the bytes of PDFs held by extractions at the same time.
+    acquire() waits until there is room, giving up with a 503 after wait_seconds
+    unless asked to wait for as long as it takes; release() must be called on the
+    event loop.
+    """
+
+    def __init__(self, limit: int, wait_seconds: float = PDF_INFLIGHT_WAIT_SECONDS):
+        self.limit = limit
+        self.wait_seconds = wait_seconds
+        self.in_flight = 0
+        self._released: asyncio.Event | None = None
+
+    async def acquire(self, size: int, wait: bool = False) -> None:
+        if size > self.limit:
+            raise HTTPException(status_code=413, detail="PDF is too large to process")
+        if self._released is None:
+            self._released = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        deadline = None if wait else loop.time() + self.wait_seconds
+        while self.in_flight + size > self.limit:
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                inflight_rejections.inc()
+                raise HTTPException(status_code=503, detail="Too many PDFs are being processed, please retry later")
+            self._released.clear()
+            try:
+                await asyncio.wait_for(self._released.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        self.in_flight += size
+        inflight_bytes_gauge.set(self.in_flight)
+
+    def release(self, size: int) -> None:
+        self.in_flight -= size
+        inflight_bytes_gauge.set(self.in_flight)
+        if self._released is not None:
+            self._released.set()
+
+
+inflight_bytes = InflightBytes(PDF_MAX_INFLIGHT_BYTES)
+
+
+class SpooledPDF:
+    """
+    An uploaded PDF held for extraction: bytes when small, otherwise a temp file
+    that is opened memory-mapped. `source` is what the extraction functions take
+    (and what is sent to page worker processes), so large files are never copied
+    into Python memory. close() deletes the temp file (unless it belongs to someone
+    else, e.g. a stored upload) and releases the byte budget.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        size: int,
+        sha256: str,
+        data: bytes | None = None,
+        path: str | None = None,
+        budget: InflightBytes | None = None,
+        owns_file: bool = True,
+    ):
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256
+        self.data = data
+        self.path = path
+        self.owns_file = owns_file
+        self._budget = budget
+
+    @property
+    def source(self) -> bytes | str:
+        return self.data if self.data is not None else self.path
+
+    async def reserve(self, budget: "InflightBytes | None" = None, wait: bool = False) -> None:
+        """
+        Takes this PDF's share of the in-flight byte budget, waiting for room if needed;
+        with wait, for as long as it takes rather than up to PDF_INFLIGHT_WAIT_SECONDS.
+        """
+        if self._budget is not None:
+            return
+        budget = budget or inflight_bytes
+        await budget.acquire(self.size, wait=wait)
+        self._budget = budget
+
+    def close(self) -> None:
+        if self.path:
+            if self.owns_file:
+                try:
+                    os.unlink(self.path)
+                except FileNotFoundError:
+                    pass
+            self.path = None
+        self.data = None
+        if self._budget is not None:
+            self._budget.release(self.size)
+            self._budget = None
+
+
+@contextmanager
+def open_pdf_stream(source: bytes | str) -> Iterator[BinaryIO]:
+    """Opens a PDF source (bytes or a file path) as a seekable stream; files are memory-mapped."""
+    if not isinstance(source, str):
+        yield BytesIO(source)
+        return
+    with open(source, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap cannot map an empty file
+            yield BytesIO(b"")
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+def _upload_size(upload: BinaryIO) -> int:
+    upload.seek(0, os.SEEK_END)
+    size = upload.tell()
+    upload.seek(0)
+    return size
+
+
+def _spool(upload: BinaryIO, size: int, to_disk: bool = False) -> tuple[bytes | None, str | None, str]:
+    """Copies the upload in chunks, hashing along the way. Returns (data, path, sha256)."""
+    digest = hashlib.sha256()
+    if size <= PDF_SPOOL_MAX_MEMORY and not to_disk:
+        data = upload.read()
+        digest.update(data)
+        return data, None, digest.hexdigest()
+
+    fd, path = tempfile.mkstemp(suffix=".pdf", prefix="extract_", dir=PDF_SPOOL_DIR)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = upload.read(PDF_SPOOL_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+    except Exception:
+        os.unlink(path)
+        raise
+    return None, path, digest.hexdigest()
+
+
+async def ingest_pdf_upload(file: UploadFile, defer_reservation: bool = False) -> SpooledPDF:
+    """
+    Validates a PDF upload and spools it for extraction within the memory budgets:
+    PDF_MAX_REQUEST_BYTES per request and PDF_MAX_INFLIGHT_BYTES across all requests.
+    With defer_reservation (for batches) the file always goes to disk and the caller
+    calls reserve() right before processing it.
+    The caller owns the returned SpooledPDF and must close() it.
+    """
+    if not file.filename or not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+
+    size = await run_in_threadpool(_upload_size, file.file)
+    if size == 0:
+        raise HTTPException(status_code=400, detail="Empty PDF file")
+    if size > PDF_MAX_REQUEST_BYTES:
+        raise HTTPException(status_code=413, detail=f"PDF exceeds the {PDF_MAX_REQUEST_BYTES // (1024 * 1024)} MB limit")
+
+    if defer_reservation:
+        data, path, sha256 = await run_in_threadpool(_spool, file.file, size, True)
+        return SpooledPDF(file.filename, size, sha256, data=data, path=path)
+
+    await inflight_bytes.acquire(size)
+    try:
+        data, path, sha256 = await run_in_threadpool(_spool, file.file, size)
+    except Exception:
+        inflight_bytes.release(size)
+        raise
+    return SpooledPDF(file.filename, size, sha256, data=data, path=path, budget=inflight_bytes)
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(PDF_SPOOL_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def open_stored_pdf(path: str, filename: str, sha256: str | None = None) -> SpooledPDF:
+    """
+    Wraps a PDF already on disk (e.g. a stored upload) for extraction without copying it.
+    The file is memory-mapped in place and left alone by close(); the byte budget is
+    reserved like for an upload. sha256 is computed when the caller does not know it.
+    The caller owns the returned SpooledPDF and must close() it.
+    """
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Stored file missing")
+    if size == 0:
+        raise HTTPException(status_code=400, detail="Empty PDF file")
+    if size > PDF_MAX_REQUEST_BYTES:
+        raise HTTPException(status_code=413, detail=f"PDF exceeds the {PDF_MAX_REQUEST_BYTES // (1024 * 1024)} MB limit")
+
+    if sha256 is None:
+        sha256 = await run_in_threadpool(_hash_file, path)
+    await inflight_bytes.acquire(size)
+    return SpooledPDF(filename, size, sha256, path=path, budget=inflight_bytes, owns_file=False)
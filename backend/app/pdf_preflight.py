@@ -0,0 +1,122 @@
+import os
+import re
+import time
+import logging
+
+import PyPDF2
+from dotenv import load_dotenv
+
+from .pdf_ingest import open_pdf_stream
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Reject image-only and encrypted PDFs before the full layout parse
+PDF_PREFLIGHT_ENABLED = os.getenv("PDF_PREFLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+# Pages inspected per document: first, last and evenly spaced pages in between
+PDF_PREFLIGHT_SAMPLE_PAGES = int(os.getenv("PDF_PREFLIGHT_SAMPLE_PAGES", "5"))
+
+# Text showing operators: Tj, TJ, ' and "
+_TEXT_OPERATOR = re.compile(rb"(?:\)|\]|>)\s*(?:Tj|TJ|'|\")")
+# CAD exports nest drawing content in form XObjects; look this many levels deep
+_MAX_FORM_DEPTH = 3
+
+
+def _sample_indices(page_count: int, sample_size: int) -> list[int]:
+    if page_count <= sample_size:
+        return list(range(page_count))
+    step = (page_count - 1) / (sample_size - 1)
+    return sorted({round(i * step) for i in range(sample_size)})
+
+
+def _resolve(obj):
+    return obj.get_object() if hasattr(obj, "get_object") else obj
+
+
+def _form_xobjects(resources) -> list:
+    resources = _resolve(resources)
+    if not resources:
+        return []
+    xobjects = _resolve(resources.get("/XObject")) or {}
+    forms = []
+    for xobject in xobjects.values():
+        xobject = _resolve(xobject)
+        if xobject.get("/Subtype") == "/Form":
+            forms.append(xobject)
+    return forms
+
+
+def _has_fonts(resources, depth: int = 0) -> bool:
+    """True when the resources (or a form XObject inside them) declare a font."""
+    resources = _resolve(resources)
+    if not resources:
+        return False
+    if _resolve(resources.get("/Font")):
+        return True
+    if depth >= _MAX_FORM_DEPTH:
+        return False
+    return any(_has_fonts(form.get("/Resources"), depth + 1) for form in _form_xobjects(resources))
+
+
+def _has_text_operators(contents, resources, depth: int = 0) -> bool:
+    """True when a content stream (or a form XObject it can draw) shows text."""
+    if contents is not None and _TEXT_OPERATOR.search(contents.get_data()):
+        return True
+    if depth >= _MAX_FORM_DEPTH:
+        return False
+    return any(_has_text_operators(form, form.get("/Resources"), depth + 1) for form in _form_xobjects(resources))
+
+
+def classify_pdf(pdf_source: bytes | str, sample_size: int = PDF_PREFLIGHT_SAMPLE_PAGES) -> dict:
+    """
+    Classifies a PDF from its structure alone, without layout analysis.
+    Checks the encryption flag, then the font resources and text operators of a
+    sample of pages, including the form XObjects they draw. classification is
+    "text", "image_only" (no sampled page has fonts or text operators), "encrypted"
+    or "unknown" (the structure could not be read or the signs disagree; the full
+    parse decides).
+    """
+    start = time.perf_counter()
+    result = {
+        "classification": "unknown",
+        "pages": None,
+        "sampled_pages": [],
+        "pages_with_fonts": 0,
+        "pages_with_text": 0,
+    }
+    try:
+        with open_pdf_stream(pdf_source) as stream:
+            reader = PyPDF2.PdfReader(stream)
+            if reader.is_encrypted:
+                # Encrypted with an empty user password still opens in pdfplumber
+                try:
+                    decrypted = reader.decrypt("")
+                except Exception as e:
+                    # e.g. AES-256 without a crypto library; pdfplumber may still open it
+                    logger.info(f"PDF pre-flight could not decrypt the file, leaving it to the full parse: {e}")
+                    return result
+                if not decrypted:
+                    result["classification"] = "encrypted"
+                    return result
+
+            page_count = len(reader.pages)
+            result["pages"] = page_count
+            for index in _sample_indices(page_count, sample_size):
+                page = reader.pages[index]
+                result["sampled_pages"].append(index + 1)
+                resources = page.get("/Resources")
+                if _has_fonts(resources):
+                    result["pages_with_fonts"] += 1
+                if _has_text_operators(page.get_contents(), resources):
+                    result["pages_with_text"] += 1
+
+            if result["pages_with_text"]:
+                result["classification"] = "text"
+            elif not result["pages_with_fonts"]:
+                result["classification"] = "image_only"
+    except Exception as e:
+        logger.warning(f"PDF pre-flight check failed: {e}")
+    finally:
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
@@ -0,0 +1,143 @@
+import os
+import re
+from typing import Iterable
+
+from dotenv import load_dotenv
+
+from . import metrics
+
+load_dotenv()
+
+# Approximate token budget for the PDF text placed in the extraction prompt
+OLLAMA_PROMPT_TOKEN_BUDGET = int(os.getenv("OLLAMA_PROMPT_TOKEN_BUDGET", "2000"))
+
+# Rough average for English text with the tokenizers of the local models we run
+CHARS_PER_TOKEN = 4
+
+# Section markers added by extract_text_from_pdf carry no information for the model
+_PAGE_MARKER = re.compile(r'^--- Page \d+(?: Title Block(?: \(Wide\))?)? ---$')
+
+# Words that usually sit next to a title block value
+_TITLE_BLOCK_HINTS = re.compile(
+    r'\b(?:job|project|proj|no\.?|number|architect|architecture|engineer|engineering|p\.?e\.?|'
+    r'contractor|client|owner|fabricator|fabrication|detailer|detailing|drawn|checked|'
+    r'calc|calculations?|standards?|code|aisc|astm|drawing|drawings|title|sheet|'
+    r'location|address|country|seal|revision|date)\b',
+    re.IGNORECASE,
+)
+
+prompt_tokens = metrics.histogram(
+    "extraction_prompt_tokens", "Estimated PDF text tokens sent per prompt",
+    (100, 250, 500, 1000, 2000, 4000, 8000),
+)
+prompt_tokens_saved = metrics.counter(
+    "extraction_prompt_tokens_saved_total", "Estimated tokens removed by deduplication and budgeting",
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class PromptContext:
+    """The PDF text chosen for a prompt, with the numbers behind the choice."""
+
+    def __init__(self, text: str, lines_in: int, lines_unique: int, lines_kept: int, tokens_before: int):
+        self.text = text
+        self.lines_in = lines_in
+        self.lines_unique = lines_unique
+        self.lines_kept = lines_kept
+        self.tokens_before = tokens_before
+        self.tokens_after = estimate_tokens(text)
+        self.tokens_saved = max(0, tokens_before - self.tokens_after)
+
+    def to_dict(self) -> dict:
+        return {
+            "lines_in": self.lines_in,
+            "lines_unique": self.lines_unique,
+            "lines_kept": self.lines_kept,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+def _line_score(line: str, from_title_block: bool) -> float:
+    """Higher for lines that look like title block entries."""
+    score = 2.0 * len(_TITLE_BLOCK_HINTS.findall(line))
+    if ':' in line:
+        score += 1.0
+    if from_title_block:
+        score += 2.0
+    if any(ch.isdigit() for ch in line):
+        score += 0.5
+    # General notes paragraphs rarely hold project metadata
+    if len(line) > 200:
+        score -= 2.0
+    return score
+
+
+def _lines(text: str | Iterable[str]) -> Iterable[str]:
+    return text.split('\n') if isinstance(text, str) else text
+
+
+def build_prompt_context(
+    title_block_text: str | Iterable[str],
+    full_text: str | Iterable[str],
+    token_budget: int = OLLAMA_PROMPT_TOKEN_BUDGET,
+) -> PromptContext:
+    """
+    Selects the PDF text for the extraction prompt. Each source is a string or an
+    iterable of lines (e.g. ExtractedText.iter_lines()).
+    Lines from the title block crops and the full text are deduplicated (ignoring case and
+    spacing), ranked by how likely they are to hold title block labels, and the best lines
+    are packed into token_budget. Kept lines stay in document order, title block first.
+    """
+    seen = set()
+    candidates = []
+    lines_in = 0
+    # Characters of each source, counted as they stream past (newline-joined)
+    source_chars = {True: 0, False: 0}
+    for source_text, from_title_block in ((title_block_text, True), (full_text, False)):
+        for raw_line in _lines(source_text):
+            if source_chars[from_title_block]:
+                source_chars[from_title_block] += 1
+            source_chars[from_title_block] += len(raw_line)
+            line = ' '.join(raw_line.split())
+            if not line:
+                continue
+            lines_in += 1
+            if len(line) < 3 or _PAGE_MARKER.match(line):
+                continue
+            key = line.casefold()
+            if key in seen:
+                continue
+            seen.add(key)
+            candidates.append((len(candidates), line, from_title_block))
+
+    selected = []
+    used_tokens = 0
+    scored = [(position, line, _line_score(line, from_title_block)) for position, line, from_title_block in candidates]
+    for position, line, score in sorted(scored, key=lambda c: (-c[2], c[0])):
+        # +1 for the newline joining it to the next line
+        line_tokens = estimate_tokens(line) + 1
+        if used_tokens + line_tokens > token_budget:
+            continue
+        selected.append((position, line))
+        used_tokens += line_tokens
+    selected.sort()
+
+    # What the prompt used to carry: the title block text, or the full text without one,
+    # cut at 8000 characters
+    has_title_block = any(from_title_block for _, _, from_title_block in candidates)
+    original_chars = min(source_chars[has_title_block], 8000)
+    context = PromptContext(
+        text='\n'.join(line for _, line in selected),
+        lines_in=lines_in,
+        lines_unique=len(candidates),
+        lines_kept=len(selected),
+        tokens_before=(original_chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN,
+    )
+    prompt_tokens.observe(context.tokens_after)
+    prompt_tokens_saved.inc(context.tokens_saved)
+    return context
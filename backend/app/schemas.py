@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, PrivateAttr
 from datetime import datetime
 
 class SignUpRequest(BaseModel):
@@ -149,4 +149,19 @@ class PDFExtractionResponse(BaseModel):
     contract_drawings: str | None = None
     standards: str | None = None
     detailer: str | None = None
-    detailing_country: str | None = None
\ No newline at end of file
+    detailing_country: str | None = None
+    # Set when the model was unavailable and the fields come from pattern matching;
+    # not part of the response body
+    _pattern_fallback: bool = PrivateAttr(default=False)
+
+    @property
+    def pattern_fallback(self) -> bool:
+        return self._pattern_fallback
+
+
+class UploadSessionCreate(BaseModel):
+    # camelCase like the uploads endpoints' query parameters and responses
+    fileName: str = Field(min_length=1, max_length=512)
+    size: int = Field(gt=0)
+    chunkSize: int | None = None
+    sha256: str | None = Field(None, min_length=64, max_length=64)
@@ -0,0 +1,185 @@
+import os
+import re
+import hashlib
+import threading
+
+from dotenv import load_dotenv
+from pdfplumber.utils import extract_words
+
+from . import metrics
+from .extraction_cache import extraction_cache, EXTRACTION_CACHE_ENABLED
+
+load_dotenv()
+
+# Locate the title block from ruling lines and label words instead of fixed crop boxes
+TITLE_BLOCK_LOCATOR = os.getenv("TITLE_BLOCK_LOCATOR", "true").lower() in ("1", "true", "yes")
+# Label words a region needs before it is taken for the title block
+TITLE_BLOCK_MIN_LABELS = int(os.getenv("TITLE_BLOCK_MIN_LABELS", "3"))
+
+# Words that label title block entries
+_LABEL_WORD = re.compile(
+    r'^(?:job|project|proj|no\.?|number|architect|engineer|contractor|client|owner|fabricator|'
+    r'detailer|drawn|checked|approved|date|scale|sheet|title|drawing|dwg|revision|rev|seal|'
+    r'location|address|country|standards|code|calc|calculations)[:#.]?$',
+    re.IGNORECASE,
+)
+
+# Title blocks run along the bottom or right edge of the sheet
+_BOTTOM_STRIP = 0.6
+_RIGHT_STRIP = 0.6
+# Label words are clustered within a window this wide (bottom) or tall (right)
+_BOTTOM_WINDOW = 0.45
+_RIGHT_WINDOW = 0.6
+_PADDING = 2.0
+# A located box covering more of the sheet than this is not a title block
+_MAX_AREA = 0.5
+
+templates_located = metrics.counter("title_block_templates_located_total", "Title blocks located from ruling lines and labels")
+template_hits = metrics.counter("title_block_template_hits_total", "Pages whose title block came from a remembered template")
+template_misses = metrics.counter("title_block_template_misses_total", "Pages without a title block box (fixed crops used)")
+
+# fingerprint -> box as page fractions (x0, top, x1, bottom). Misses are not kept, so
+# a page where no title block was found never decides for the rest of its template.
+_templates: dict[str, tuple] = {}
+_templates_lock = threading.Lock()
+
+
+def layout_fingerprint(page) -> str | None:
+    """
+    Identifies a drawing template by page size and the ruling lines that meet the bottom
+    or right side of the sheet (title block and border lines), on a 1% grid. Schedules
+    and details in the drawing area do not reach the sheet edges, so they vary freely.
+    None when there are no such lines: page size alone does not identify a template.
+    """
+    width, height = page.width, page.height
+    marks = set()
+    for edge in page.edges:
+        if edge["orientation"] == "v":
+            if edge["bottom"] >= height * 0.9 and edge["bottom"] - edge["top"] >= height * 0.05:
+                marks.add(("v", round(edge["x0"] / width * 100)))
+        elif edge["x1"] >= width * 0.9 and edge["x1"] - edge["x0"] >= width * 0.05:
+            marks.add(("h", round(edge["top"] / height * 100)))
+    if not marks:
+        return None
+    digest = hashlib.sha1(repr(sorted(marks)).encode()).hexdigest()[:16]
+    return f"{round(width)}x{round(height)}:{digest}"
+
+
+def _densest(words: list[dict], key: str, window: float) -> list[dict]:
+    """The words inside the window (along key) that holds the most of them."""
+    ordered = sorted(words, key=lambda w: w[key])
+    best: list[dict] = []
+    start = 0
+    for end in range(len(ordered)):
+        while ordered[end][key] - ordered[start][key] > window:
+            start += 1
+        if end - start + 1 > len(best):
+            best = ordered[start:end + 1]
+    return best
+
+
+def _snap(box: list[float], edges: list[dict], width: float, height: float) -> list[float] | None:
+    """
+    Grows the label box out to the nearest ruling lines enclosing it. Sides without a
+    ruling keep the label box's left/top edge, or run to the sheet's right/bottom
+    edge, where the values next to the labels end up. None when no ruling encloses
+    the labels at all.
+    """
+    x0, top, x1, bottom = box
+    left = upper = right = lower = None
+    for edge in edges:
+        if edge["orientation"] == "v":
+            # Must run along most of the box's height
+            if min(edge["bottom"], bottom) - max(edge["top"], top) < (bottom - top) * 0.5:
+                continue
+            if edge["x0"] <= x0:
+                left = edge["x0"] if left is None else max(left, edge["x0"])
+            elif edge["x0"] >= x1:
+                right = edge["x0"] if right is None else min(right, edge["x0"])
+        else:
+            if min(edge["x1"], x1) - max(edge["x0"], x0) < (x1 - x0) * 0.5:
+                continue
+            if edge["top"] <= top:
+                upper = edge["top"] if upper is None else max(upper, edge["top"])
+            elif edge["top"] >= bottom:
+                lower = edge["top"] if lower is None else min(lower, edge["top"])
+    if left is None and upper is None and right is None and lower is None:
+        return None
+    return [
+        x0 if left is None else left,
+        top if upper is None else upper,
+        width if right is None else right,
+        height if lower is None else lower,
+    ]
+
+
+def locate_title_block(page, chars: list[dict]) -> tuple | None:
+    """
+    Finds the title block of a page: the densest cluster of label words in the bottom or
+    right strip of the sheet, grown out to the ruling lines around it.
+    Returns (x0, top, x1, bottom) as fractions of the page size, or None (the fixed
+    crops are used) when there are too few labels, no rulings around them or the box
+    would cover much of the sheet.
+    """
+    width, height = page.width, page.height
+    strip_chars = [c for c in chars if c["top"] >= height * _BOTTOM_STRIP or c["x0"] >= width * _RIGHT_STRIP]
+    labels = [w for w in extract_words(strip_chars) if _LABEL_WORD.match(w["text"])]
+    bottom = _densest([w for w in labels if w["top"] >= height * _BOTTOM_STRIP], "x0", width * _BOTTOM_WINDOW)
+    right = _densest([w for w in labels if w["x0"] >= width * _RIGHT_STRIP], "top", height * _RIGHT_WINDOW)
+    cluster = bottom if len(bottom) >= len(right) else right
+    if len(cluster) < TITLE_BLOCK_MIN_LABELS:
+        return None
+
+    box = [
+        min(w["x0"] for w in cluster) - _PADDING,
+        min(w["top"] for w in cluster) - _PADDING,
+        max(w["x1"] for w in cluster) + _PADDING,
+        max(w["bottom"] for w in cluster) + _PADDING,
+    ]
+    snapped = _snap(box, page.edges, width, height)
+    if snapped is None:
+        return None
+    x0, top, x1, bottom_edge = snapped
+    if (x1 - x0) * (bottom_edge - top) > width * height * _MAX_AREA:
+        return None
+    templates_located.inc()
+    return (x0 / width, top / height, x1 / width, bottom_edge / height)
+
+
+def title_block_box(page, chars: list[dict]) -> tuple | None:
+    """
+    The title block box of a page in page coordinates, from the remembered template for
+    its layout when there is one, otherwise located (and remembered for later sheets and
+    files). Pages without edge rulings have no template and are located on their own.
+    None when the locator is off or no title block could be found.
+    """
+    if not TITLE_BLOCK_LOCATOR:
+        return None
+    fingerprint = layout_fingerprint(page)
+    fractions = None
+    if fingerprint is not None:
+        with _templates_lock:
+            fractions = _templates.get(fingerprint)
+        if fractions is None and EXTRACTION_CACHE_ENABLED:
+            stored = extraction_cache.get_template(fingerprint)
+            if stored is not None:
+                fractions = tuple(stored)
+                with _templates_lock:
+                    _templates[fingerprint] = fractions
+        if fractions is not None:
+            template_hits.inc()
+
+    if fractions is None:
+        fractions = locate_title_block(page, chars)
+        if fractions is None:
+            template_misses.inc()
+            return None
+        if fingerprint is not None:
+            with _templates_lock:
+                # Another thread may have located this template meanwhile; keep the first
+                fractions = _templates.setdefault(fingerprint, fractions)
+            if EXTRACTION_CACHE_ENABLED:
+                extraction_cache.put_template(fingerprint, list(fractions))
+
+    x0, top, x1, bottom = fractions
+    return (x0 * page.width, top * page.height, x1 * page.width, bottom * page.height)
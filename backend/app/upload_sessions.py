@@ -0,0 +1,333 @@
+import os
+import re
+import json
+import asyncio
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+
+from . import metrics
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Resumable uploads are assembled here, one directory per session
+UPLOAD_SESSION_DIR = os.getenv("UPLOAD_SESSION_DIR", os.path.join(os.path.dirname(__file__), "uploads", "sessions"))
+# Sessions without any activity for this long are deleted
+UPLOAD_SESSION_TTL_SECONDS = int(os.getenv("UPLOAD_SESSION_TTL_SECONDS", str(24 * 3600)))
+UPLOAD_SESSION_MAX_BYTES = int(os.getenv("UPLOAD_SESSION_MAX_BYTES", str(10 * 1024 * 1024 * 1024)))
+UPLOAD_CHUNK_MIN_BYTES = 256 * 1024
+UPLOAD_CHUNK_MAX_BYTES = 64 * 1024 * 1024
+UPLOAD_CHUNK_DEFAULT_BYTES = 8 * 1024 * 1024
+# Chunk bodies are written to disk in pieces of this size as they arrive
+_WRITE_PIECE_BYTES = 1024 * 1024
+_HASH_READ_BYTES = 4 * 1024 * 1024
+_SWEEP_INTERVAL_SECONDS = 60
+# Stale sessions are also swept this often in the background, not only when a new one starts
+UPLOAD_SESSION_SWEEP_SECONDS = int(os.getenv("UPLOAD_SESSION_SWEEP_SECONDS", "900"))
+
+_SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+sessions_created = metrics.counter("upload_sessions_created_total", "Resumable upload sessions created")
+sessions_completed = metrics.counter("upload_sessions_completed_total", "Resumable upload sessions finalized")
+sessions_expired = metrics.counter("upload_sessions_expired_total", "Resumable upload sessions deleted after going stale")
+chunk_bytes = metrics.counter("upload_session_chunk_bytes_total", "Bytes received in resumable upload chunks")
+
+_last_sweep = 0.0
+_sweeper: asyncio.Task | None = None
+
+
+class UploadSession:
+    """
+    A resumable upload on disk. The file is preallocated as `data` and every chunk is
+    written straight to its offset in it, so chunks can arrive in any order and in
+    parallel, and finalizing needs no assembly step. A marker file per chunk records
+    what has been received; `session.json` holds the upload's metadata and its
+    modification time is the session's last activity.
+    """
+
+    def __init__(self, session_id: str, meta: dict):
+        self.id = session_id
+        self.meta = meta
+
+    @property
+    def directory(self) -> str:
+        return os.path.join(UPLOAD_SESSION_DIR, self.id)
+
+    @property
+    def data_path(self) -> str:
+        return os.path.join(self.directory, "data")
+
+    @property
+    def size(self) -> int:
+        return self.meta["size"]
+
+    @property
+    def chunk_size(self) -> int:
+        return self.meta["chunk_size"]
+
+    @property
+    def total_chunks(self) -> int:
+        return max(1, -(-self.size // self.chunk_size))
+
+    def chunk_length(self, index: int) -> int:
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    def received_chunks(self) -> list[int]:
+        return sorted(int(name) for name in os.listdir(os.path.join(self.directory, "chunks")))
+
+    def missing_chunks(self) -> list[int]:
+        received = set(self.received_chunks())
+        return [index for index in range(self.total_chunks) if index not in received]
+
+    def touch(self) -> None:
+        os.utime(os.path.join(self.directory, "session.json"))
+
+    def status(self) -> dict:
+        received = self.received_chunks()
+        received_set = set(received)
+        return {
+            "sessionId": self.id,
+            "fileName": self.meta["file_name"],
+            "size": self.size,
+            "chunkSize": self.chunk_size,
+            "totalChunks": self.total_chunks,
+            "receivedChunks": received,
+            "missingChunks": [index for index in range(self.total_chunks) if index not in received_set],
+            "expiresAt": os.path.getmtime(os.path.join(self.directory, "session.json")) + UPLOAD_SESSION_TTL_SECONDS,
+        }
+
+
+def _create(meta: dict) -> UploadSession:
+    session = UploadSession(uuid.uuid4().hex, meta)
+    os.makedirs(os.path.join(session.directory, "chunks"))
+    with open(session.data_path, "wb") as f:
+        # Sparse until the chunks are written
+        f.truncate(session.size)
+    with open(os.path.join(session.directory, "session.json"), "w") as f:
+        json.dump(meta, f)
+    return session
+
+
+async def create_session(file_name: str, size: int, chunk_size: int | None = None, sha256: str | None = None, **fields) -> UploadSession:
+    """
+    Starts a resumable upload of size bytes. fields are kept with the session for the
+    record created when it is finalized; sha256, when given, is checked at the end.
+    """
+    if size <= 0:
+        raise HTTPException(status_code=400, detail="Upload size must be positive")
+    if size > UPLOAD_SESSION_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the {UPLOAD_SESSION_MAX_BYTES // (1024 * 1024)} MB limit")
+    chunk_size = chunk_size or UPLOAD_CHUNK_DEFAULT_BYTES
+    if not UPLOAD_CHUNK_MIN_BYTES <= chunk_size <= UPLOAD_CHUNK_MAX_BYTES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"chunkSize must be between {UPLOAD_CHUNK_MIN_BYTES} and {UPLOAD_CHUNK_MAX_BYTES} bytes",
+        )
+    if sha256 is not None and not re.fullmatch(r"[0-9a-f]{64}", sha256.lower()):
+        raise HTTPException(status_code=400, detail="sha256 must be 64 hex characters")
+
+    await run_in_threadpool(expire_sessions)
+    meta = {
+        "file_name": file_name,
+        "size": size,
+        "chunk_size": chunk_size,
+        "sha256": sha256.lower() if sha256 else None,
+        "fields": fields,
+    }
+    session = await run_in_threadpool(_create, meta)
+    sessions_created.inc()
+    return session
+
+
+def _load(session_id: str) -> UploadSession | None:
+    if not _SESSION_ID.match(session_id):
+        return None
+    path = os.path.join(UPLOAD_SESSION_DIR, session_id, "session.json")
+    try:
+        if time.time() - os.path.getmtime(path) > UPLOAD_SESSION_TTL_SECONDS:
+            _remove(session_id)
+            sessions_expired.inc()
+            return None
+        with open(path) as f:
+            return UploadSession(session_id, json.load(f))
+    except FileNotFoundError:
+        return None
+
+
+async def get_session(session_id: str) -> UploadSession:
+    session = await run_in_threadpool(_load, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+    return session
+
+
+def _write_at(path: str, offset: int, data: bytes) -> None:
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(fd, view, offset)
+            view = view[written:]
+            offset += written
+    finally:
+        os.close(fd)
+
+
+def _begin_chunk(session: UploadSession, index: int) -> None:
+    if os.path.exists(os.path.join(session.directory, "finalizing")):
+        raise HTTPException(status_code=409, detail="Upload session is being finalized")
+    # A chunk being re-sent is not received again until it has been written in full
+    try:
+        os.unlink(os.path.join(session.directory, "chunks", str(index)))
+    except FileNotFoundError:
+        pass
+
+
+def _mark_received(session: UploadSession, index: int) -> None:
+    open(os.path.join(session.directory, "chunks", str(index)), "wb").close()
+    session.touch()
+
+
+async def write_chunk(session: UploadSession, index: int, body: AsyncIterator[bytes]) -> None:
+    """
+    Streams a chunk body to its place in the session file. The chunk only counts as
+    received once all of its bytes are on disk; a repeated chunk simply overwrites.
+    """
+    if not 0 <= index < session.total_chunks:
+        raise HTTPException(status_code=400, detail=f"Chunk index must be between 0 and {session.total_chunks - 1}")
+    await run_in_threadpool(_begin_chunk, session, index)
+    expected = session.chunk_length(index)
+    offset = index * session.chunk_size
+    received = 0
+    pending = bytearray()
+    async for piece in body:
+        received += len(piece)
+        if received > expected:
+            raise HTTPException(status_code=400, detail=f"Chunk {index} must be {expected} bytes")
+        pending += piece
+        if len(pending) >= _WRITE_PIECE_BYTES:
+            await run_in_threadpool(_write_at, session.data_path, offset, bytes(pending))
+            offset += len(pending)
+            pending.clear()
+    if received != expected:
+        raise HTTPException(status_code=400, detail=f"Chunk {index} must be {expected} bytes, got {received}")
+    if pending:
+        await run_in_threadpool(_write_at, session.data_path, offset, bytes(pending))
+    await run_in_threadpool(_mark_received, session, index)
+    chunk_bytes.inc(received)
+
+
+def _hash_data(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(_HASH_READ_BYTES)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _begin_finalize(session: UploadSession) -> None:
+    try:
+        fd = os.open(os.path.join(session.directory, "finalizing"), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        raise HTTPException(status_code=409, detail="Upload session is already being finalized")
+    os.close(fd)
+    session.touch()
+
+
+def abort_finalize(session: UploadSession) -> None:
+    """Lets a session be finalized again after a failed attempt."""
+    try:
+        os.unlink(os.path.join(session.directory, "finalizing"))
+    except FileNotFoundError:
+        pass
+
+
+async def finalize_session(session: UploadSession) -> str:
+    """
+    Checks that every chunk arrived and hashes the assembled file in one streaming
+    pass. Returns its sha256; the caller stores the file at session.data_path and
+    then calls complete_session(), or abort_finalize() if that fails. Raises 409
+    while chunks are missing.
+    """
+    missing = await run_in_threadpool(session.missing_chunks)
+    if missing:
+        raise HTTPException(status_code=409, detail={"message": "Upload is incomplete", "missingChunks": missing})
+    await run_in_threadpool(_begin_finalize, session)
+    try:
+        sha256 = await run_in_threadpool(_hash_data, session.data_path)
+    except Exception:
+        await run_in_threadpool(abort_finalize, session)
+        raise
+    expected = session.meta.get("sha256")
+    if expected and expected != sha256:
+        await run_in_threadpool(abort_finalize, session)
+        raise HTTPException(status_code=422, detail="Uploaded data does not match the declared sha256")
+    return sha256
+
+
+def _remove(session_id: str) -> None:
+    shutil.rmtree(os.path.join(UPLOAD_SESSION_DIR, session_id), ignore_errors=True)
+
+
+def complete_session(session: UploadSession) -> None:
+    _remove(session.id)
+    sessions_completed.inc()
+
+
+def expire_sessions(force: bool = False) -> int:
+    """Deletes sessions idle for longer than UPLOAD_SESSION_TTL_SECONDS; sweeps at most once a minute."""
+    global _last_sweep
+    now = time.time()
+    if not force and now - _last_sweep < _SWEEP_INTERVAL_SECONDS:
+        return 0
+    _last_sweep = now
+    try:
+        session_ids = os.listdir(UPLOAD_SESSION_DIR)
+    except FileNotFoundError:
+        return 0
+    expired = 0
+    for session_id in session_ids:
+        path = os.path.join(UPLOAD_SESSION_DIR, session_id, "session.json")
+        try:
+            idle = now - os.path.getmtime(path)
+        except FileNotFoundError:
+            # Half-created or being removed; judged by the directory itself
+            try:
+                idle = now - os.path.getmtime(os.path.join(UPLOAD_SESSION_DIR, session_id))
+            except FileNotFoundError:
+                continue
+        if idle > UPLOAD_SESSION_TTL_SECONDS:
+            _remove(session_id)
+            expired += 1
+    if expired:
+        sessions_expired.inc(expired)
+        logger.info(f"Expired {expired} stale upload session(s)")
+    return expired
+
+
+async def _sweep_periodically() -> None:
+    while True:
+        try:
+            await run_in_threadpool(expire_sessions, True)
+        except Exception as e:
+            logger.warning(f"Upload session sweep failed: {e}")
+        await asyncio.sleep(UPLOAD_SESSION_SWEEP_SECONDS)
+
+
+def start_session_sweeper() -> None:
+    """Sweeps stale sessions now and every UPLOAD_SESSION_SWEEP_SECONDS; call on the event loop at startup."""
+    global _sweeper
+    if _sweeper is None or _sweeper.done():
+        _sweeper = asyncio.get_running_loop().create_task(_sweep_periodically())
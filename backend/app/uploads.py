@@ -1,18 +1,39 @@
 import os
-import shutil
-from datetime import datetime
+import time
+import logging
+import mimetypes
+from datetime import datetime, timezone
 from typing import List, Optional
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, BackgroundTasks, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from dotenv import load_dotenv
 
-from .db import get_db
+from .db import get_db, SessionLocal
 from .models import UploadedFile
+from .schemas import PDFExtractionResponse, UploadSessionCreate
+from .pdf_extraction import extraction_jobs
+from .pdf_ingest import open_stored_pdf
+from . import blob_store
+from . import upload_sessions
+from .zip_stream import iter_zip
+from .file_responses import stored_file_response
+from . import metrics
+
+load_dotenv()
+
+upload_bytes = metrics.counter("upload_bytes_written_total", "Bytes of uploaded files stored (written or deduplicated)")
+upload_write_seconds = metrics.counter("upload_write_seconds_total", "Time spent hashing and writing uploaded files")
+upload_throughput = metrics.gauge("upload_write_mb_per_second", "Storage throughput of the last upload request, in MB/s")
 
 
 router = APIRouter(prefix="/api/uploads", tags=["uploads"])
 
+logger = logging.getLogger(__name__)
+
 
 def _ensure_upload_dir() -> str:
     base_dir = os.path.dirname(__file__)
@@ -21,54 +42,255 @@ def _ensure_upload_dir() -> str:
     return upload_dir
 
 
-def _safe_filename(original_name: str) -> str:
-    name, ext = os.path.splitext(original_name)
-    safe_name = "".join(c for c in name if c.isalnum() or c in ("-", "_"))[:80]
-    timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
-    return f"{safe_name or 'file'}_{timestamp}{ext}"
+def _stored_path(record: UploadedFile) -> str:
+    if record.in_blob_store:
+        return blob_store.blob_path(record.content_hash)
+    return os.path.join(_ensure_upload_dir(), record.stored_name)
+
+
+def _insert_uploads(db: Session, rows: list[dict]) -> list[int]:
+    """Inserts all the upload records of a request in one statement. Returns their ids, in order."""
+    ids = db.scalars(insert(UploadedFile).returning(UploadedFile.id, sort_by_parameter_order=True), rows).all()
+    db.commit()
+    return list(ids)
+
+
+def _store_session_upload(db: Session, session: upload_sessions.UploadSession, sha256: str, row: dict) -> int:
+    """
+    Creates the record of a finalized upload and moves its data into the blob store,
+    committing both together. On failure nothing is kept and the data stays in the
+    session, so finalizing can be retried.
+    """
+    try:
+        file_id = db.scalars(insert(UploadedFile).returning(UploadedFile.id), [row]).one()
+        blob_store.store_file(db, session.data_path, sha256, session.size)
+    except Exception:
+        db.rollback()
+        raise
+    return file_id
+
+
+def _release_blobs(db: Session, hashes: list[str]) -> None:
+    """Gives back the blob references of an upload that did not go through."""
+    db.rollback()
+    for sha256 in hashes:
+        blob_store.release_reference(db, sha256)
+    db.commit()
+
+
+def _is_pdf(name: str) -> bool:
+    return name.lower().endswith(".pdf")
+
+
+def _load_upload(db: Session, file_id: int) -> tuple[UploadedFile | None, tuple]:
+    """
+    Loads an upload record together with what extraction needs from it. The values
+    are read here because committing a status change expires the record, and
+    reading it again on the event loop would block it on the database.
+    """
+    record = db.query(UploadedFile).filter(UploadedFile.id == file_id).first()
+    if not record:
+        return None, ()
+    return record, (_stored_path(record), record.original_name, record.content_hash)
+
+
+async def _run_stored_extraction(source: tuple) -> tuple[dict, str]:
+    """
+    Runs PDF extraction on a stored upload, reading it from disk in place.
+    Returns the result and the status to store it under: "fallback" when the model was
+    unavailable and the fields come from pattern matching, so it is not kept as final.
+    """
+    path, original_name, content_hash = source
+    pdf = await open_stored_pdf(path, original_name, content_hash)
+    try:
+        result = await extraction_jobs.process(pdf)
+    finally:
+        pdf.close()
+    return result.model_dump(), "fallback" if result.pattern_fallback else "completed"
+
+
+def _save_extraction(db: Session, record: UploadedFile, status: str, result: dict | None = None, error: str | None = None) -> None:
+    record.extraction_status = status
+    record.extraction_result = result
+    record.extraction_error = error[:1000] if error else None
+    if status in ("completed", "fallback", "failed"):
+        record.extracted_at = datetime.now(timezone.utc)
+    db.commit()
+
+
+async def _extract_in_background(file_id: int) -> None:
+    """Background extraction of a fresh upload; the outcome is stored on its record."""
+    db = SessionLocal()
+    try:
+        record, source = await run_in_threadpool(_load_upload, db, file_id)
+        if not record:
+            return
+        await run_in_threadpool(_save_extraction, db, record, "running")
+        try:
+            result, status = await _run_stored_extraction(source)
+        except HTTPException as e:
+            await run_in_threadpool(_save_extraction, db, record, "failed", error=str(e.detail))
+        except Exception as e:
+            logger.error(f"Background extraction of upload {file_id} failed: {e}", exc_info=True)
+            await run_in_threadpool(_save_extraction, db, record, "failed", error=f"Error processing PDF: {str(e)}")
+        else:
+            await run_in_threadpool(_save_extraction, db, record, status, result=result)
+    finally:
+        await run_in_threadpool(db.close)
 
 
 @router.post("")
 async def upload_files(
+    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...),
     stage: int = Query(..., ge=1, le=11),
     dpId: Optional[int] = Query(None),
     projectName: Optional[str] = Query(None),
     userEmail: Optional[str] = Query(None),
+    autoExtract: bool = Query(False),
     db: Session = Depends(get_db),
 ):
+    """
+    Stores the files in the blob store: content that is already stored is not written
+    again. With autoExtract, PDFs are queued for metadata extraction after the response.
+    """
     if not files:
         raise HTTPException(status_code=400, detail="No files provided")
 
-    upload_dir = _ensure_upload_dir()
-    saved_files = []
+    rows = []
+    start = time.perf_counter()
+
+    try:
+        for file in files:
+            original_name = file.filename or "file"
+            # Takes a reference to the blob along with storing it
+            size, sha256, _ = await run_in_threadpool(blob_store.store_stream, db, file.file)
+            rows.append({
+                "original_name": original_name,
+                "stored_name": sha256,
+                "size": size,
+                "content_hash": sha256,
+                "stage": stage,
+                "dp_id": dpId,
+                "project_name": projectName,
+                "user_email": userEmail,
+                "extraction_status": "queued" if autoExtract and _is_pdf(original_name) else None,
+            })
+        elapsed = time.perf_counter() - start
+        ids = await run_in_threadpool(_insert_uploads, db, rows)
+    except Exception:
+        # Blobs no record points to are left to garbage collection
+        await run_in_threadpool(_release_blobs, db, [row["content_hash"] for row in rows])
+        raise
+
+    total_bytes = sum(row["size"] for row in rows)
+    upload_bytes.inc(total_bytes)
+    upload_write_seconds.inc(elapsed)
+    if elapsed > 0:
+        upload_throughput.set(total_bytes / (1024 * 1024) / elapsed)
 
-    for file in files:
-        safe_name = _safe_filename(file.filename or "file")
-        destination_path = os.path.join(upload_dir, safe_name)
-        with open(destination_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        size = os.path.getsize(destination_path)
-        record = UploadedFile(
-            original_name=file.filename or safe_name,
-            stored_name=safe_name,
-            size=size,
-            stage=stage,
-            dp_id=dpId,
-            project_name=projectName,
-            user_email=userEmail,
-        )
-        db.add(record)
+    saved_files = []
+    for file_id, row in zip(ids, rows):
+        if row["extraction_status"] == "queued":
+            background_tasks.add_task(_extract_in_background, file_id)
         saved_files.append({
-            "originalName": record.original_name,
-            "storedName": record.stored_name,
-            "size": record.size,
+            "id": file_id,
+            "originalName": row["original_name"],
+            "storedName": row["stored_name"],
+            "size": row["size"],
+            "extractionStatus": row["extraction_status"],
         })
-    db.commit()
 
     return {"count": len(saved_files), "files": saved_files}
 
 
+@router.post("/sessions")
+async def create_upload_session(
+    payload: UploadSessionCreate,
+    stage: int = Query(..., ge=1, le=11),
+    dpId: Optional[int] = Query(None),
+    projectName: Optional[str] = Query(None),
+    userEmail: Optional[str] = Query(None),
+    autoExtract: bool = Query(False),
+):
+    """
+    Starts a resumable upload. The file is then sent as numbered chunks of chunkSize
+    bytes (PUT /sessions/{id}/chunks/{index}, in any order and in parallel) and
+    finalized once all have arrived. Idle sessions expire after UPLOAD_SESSION_TTL_SECONDS.
+    """
+    session = await upload_sessions.create_session(
+        payload.fileName,
+        payload.size,
+        chunk_size=payload.chunkSize,
+        sha256=payload.sha256,
+        stage=stage,
+        dp_id=dpId,
+        project_name=projectName,
+        user_email=userEmail,
+        auto_extract=autoExtract,
+    )
+    return await run_in_threadpool(session.status)
+
+
+@router.get("/sessions/{session_id}")
+async def get_upload_session(session_id: str):
+    """Which chunks of a resumable upload have been received"""
+    session = await upload_sessions.get_session(session_id)
+    return await run_in_threadpool(session.status)
+
+
+@router.put("/sessions/{session_id}/chunks/{index}")
+async def put_upload_chunk(session_id: str, index: int, request: Request):
+    """Receives one chunk as the raw request body; re-sending a chunk replaces it"""
+    session = await upload_sessions.get_session(session_id)
+    await upload_sessions.write_chunk(session, index, request.stream())
+    return {"sessionId": session.id, "index": index, "received": True}
+
+
+@router.post("/sessions/{session_id}/finalize")
+async def finalize_upload_session(
+    session_id: str,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
+    """
+    Completes a resumable upload: the assembled file is hashed, its record created
+    and the file moved into the blob store (unless that content is stored already).
+    """
+    session = await upload_sessions.get_session(session_id)
+    sha256 = await upload_sessions.finalize_session(session)
+    fields = session.meta["fields"]
+    original_name = session.meta["file_name"]
+    row = {
+        "original_name": original_name,
+        "stored_name": sha256,
+        "size": session.size,
+        "content_hash": sha256,
+        "stage": fields["stage"],
+        "dp_id": fields["dp_id"],
+        "project_name": fields["project_name"],
+        "user_email": fields["user_email"],
+        "extraction_status": "queued" if fields["auto_extract"] and _is_pdf(original_name) else None,
+    }
+    try:
+        file_id = await run_in_threadpool(_store_session_upload, db, session, sha256, row)
+    except Exception:
+        await run_in_threadpool(upload_sessions.abort_finalize, session)
+        raise
+    await run_in_threadpool(upload_sessions.complete_session, session)
+
+    upload_bytes.inc(session.size)
+    if row["extraction_status"] == "queued":
+        background_tasks.add_task(_extract_in_background, file_id)
+    return {
+        "id": file_id,
+        "originalName": row["original_name"],
+        "storedName": row["stored_name"],
+        "size": row["size"],
+        "extractionStatus": row["extraction_status"],
+    }
+
+
 @router.get("")
 def list_files(stage: int = Query(..., ge=1, le=11), dpId: Optional[int] = Query(None), projectName: Optional[str] = Query(None), db: Session = Depends(get_db)):
     q = db.query(UploadedFile).filter(UploadedFile.stage == stage)
@@ -84,21 +306,132 @@ def list_files(stage: int = Query(..., ge=1, le=11), dpId: Optional[int] = Query
             "storedName": it.stored_name,
             "size": it.size,
             "dpId": getattr(it, "dp_id", None),
+            "extractionStatus": it.extraction_status,
             "createdAt": it.created_at.isoformat() if hasattr(it.created_at, 'isoformat') else str(it.created_at),
         }
         for it in items
     ]
 
 
+@router.get("/archive")
+def download_archive(
+    projectName: str = Query(...),
+    stage: int = Query(..., ge=1, le=11),
+    dpId: Optional[int] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Streams every file of a project stage (optionally one delivery point) as a ZIP.
+    Files are read from storage in chunks while the archive is sent, so memory use
+    does not grow with the archive and nothing is written to disk.
+    """
+    q = db.query(UploadedFile).filter(UploadedFile.stage == stage, UploadedFile.project_name == projectName)
+    if dpId is not None:
+        q = q.filter(UploadedFile.dp_id == dpId)
+    items = q.order_by(UploadedFile.created_at.asc()).all()
+    if not items:
+        raise HTTPException(status_code=404, detail="No files found")
+
+    entries = [
+        (_stored_path(it), it.original_name, it.created_at.timestamp() if hasattr(it.created_at, "timestamp") else None)
+        for it in items
+    ]
+    safe_project = "".join(c for c in projectName if c.isalnum() or c in ("-", "_"))[:80] or "project"
+    archive_name = f"{safe_project}_stage{stage}{f'_dp{dpId}' if dpId is not None else ''}.zip"
+    return StreamingResponse(
+        iter_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{archive_name}"'},
+    )
+
+
 @router.get("/{file_id}/download")
-def download_file(file_id: int, db: Session = Depends(get_db)):
+def download_file(file_id: int, request: Request, db: Session = Depends(get_db)):
+    """
+    Serves a stored file with an ETag from its content hash, 304 responses for
+    If-None-Match / If-Modified-Since, byte ranges and immutable cache headers.
+    """
     record = db.query(UploadedFile).filter(UploadedFile.id == file_id).first()
     if not record:
         raise HTTPException(status_code=404, detail="File not found")
-    upload_dir = _ensure_upload_dir()
-    path = os.path.join(upload_dir, record.stored_name)
-    if not os.path.exists(path):
-        raise HTTPException(status_code=404, detail="Stored file missing")
-    return FileResponse(path, filename=record.original_name)
+    media_type = mimetypes.guess_type(record.original_name)[0] or "application/octet-stream"
+    return stored_file_response(
+        request,
+        _stored_path(record),
+        record.original_name,
+        record.content_hash,
+        record.created_at,
+        media_type=media_type,
+    )
+
+
+@router.delete("/{file_id}")
+def delete_file(file_id: int, db: Session = Depends(get_db)):
+    """Deletes an upload. Its blob stays until garbage collection finds it unreferenced."""
+    record = db.query(UploadedFile).filter(UploadedFile.id == file_id).first()
+    if not record:
+        raise HTTPException(status_code=404, detail="File not found")
+    if record.in_blob_store:
+        blob_store.release_reference(db, record.content_hash)
+        db.delete(record)
+        db.commit()
+    else:
+        # Stored before the blob store; the file belongs to this record alone
+        path = _stored_path(record)
+        db.delete(record)
+        db.commit()
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+    return {"message": "File deleted successfully"}
+
+
+@router.post("/gc")
+def collect_unreferenced_blobs(db: Session = Depends(get_db)):
+    """Deletes stored blobs that no upload has referenced for BLOB_GC_GRACE_SECONDS"""
+    return blob_store.collect_garbage(db)
 
 
+@router.post("/{file_id}/extract", response_model=PDFExtractionResponse)
+async def extract_uploaded_file(file_id: int, refresh: bool = Query(False), db: Session = Depends(get_db)):
+    """
+    Extracts project information from a stored PDF upload without re-uploading it.
+    A stored result is returned as is unless refresh is set; a pattern-matching
+    fallback (stored with status "fallback") is always extracted again.
+    """
+    record, source = await run_in_threadpool(_load_upload, db, file_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="File not found")
+    if not _is_pdf(record.original_name):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+    if record.extraction_status == "completed" and record.extraction_result and not refresh:
+        return record.extraction_result
+
+    await run_in_threadpool(_save_extraction, db, record, "running")
+    try:
+        result, status = await _run_stored_extraction(source)
+    except HTTPException as e:
+        await run_in_threadpool(_save_extraction, db, record, "failed", error=str(e.detail))
+        raise
+    except Exception as e:
+        logger.error(f"Extraction of upload {file_id} failed: {str(e)}", exc_info=True)
+        await run_in_threadpool(_save_extraction, db, record, "failed", error=f"Error processing PDF: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
+    await run_in_threadpool(_save_extraction, db, record, status, result=result)
+    return result
+
+
+@router.get("/{file_id}/extraction")
+def get_upload_extraction(file_id: int, db: Session = Depends(get_db)):
+    """Status and stored result of a stored upload's extraction"""
+    record = db.query(UploadedFile).filter(UploadedFile.id == file_id).first()
+    if not record:
+        raise HTTPException(status_code=404, detail="File not found")
+    return {
+        "id": record.id,
+        "status": record.extraction_status,
+        "result": record.extraction_result,
+        "error": record.extraction_error,
+        "extractedAt": record.extracted_at.isoformat() if record.extracted_at else None,
+    }
@@ -0,0 +1,83 @@
+import os
+import time
+import zipfile
+import logging
+from typing import Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+ZIP_READ_CHUNK_SIZE = 1024 * 1024
+# Formats that are compressed already; deflating them again costs CPU for nothing
+_STORED_EXTENSIONS = {".pdf", ".zip", ".png", ".jpg", ".jpeg", ".gif", ".docx", ".xlsx", ".pptx", ".7z", ".gz", ".rar"}
+
+
+class _ChunkSink:
+    """Write-only, unseekable file object that hands its bytes out as they are written."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _unique_name(name: str, used: set[str]) -> str:
+    candidate = name
+    stem, ext = os.path.splitext(name)
+    number = 2
+    while candidate in used:
+        candidate = f"{stem} ({number}){ext}"
+        number += 1
+    used.add(candidate)
+    return candidate
+
+
+def iter_zip(entries: Iterable[tuple[str, str, float | None]]) -> Iterator[bytes]:
+    """
+    Streams a ZIP archive of (path, name in archive, modified timestamp) entries.
+    The archive is written to an unseekable sink, so sizes and CRCs go into data
+    descriptors after each file and nothing is buffered beyond one read chunk.
+    Already-compressed formats are stored as is, the rest is deflated. Files that
+    have gone missing are skipped. Names are made unique within the archive.
+    """
+    sink = _ChunkSink()
+    used_names: set[str] = set()
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as archive:
+        for path, name, modified in entries:
+            try:
+                source = open(path, "rb")
+            except FileNotFoundError:
+                logger.warning(f"Skipping missing file {path} in ZIP download")
+                continue
+            with source:
+                info = zipfile.ZipInfo(
+                    _unique_name(name, used_names),
+                    date_time=time.localtime(modified if modified is not None else os.fstat(source.fileno()).st_mtime)[:6],
+                )
+                stored = os.path.splitext(name)[1].lower() in _STORED_EXTENSIONS
+                info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+                info.external_attr = 0o644 << 16
+                # The size is not known up front, so always allow ZIP64
+                with archive.open(info, mode="w", force_zip64=True) as entry:
+                    while True:
+                        chunk = source.read(ZIP_READ_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        entry.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            data = sink.drain()
+            if data:
+                yield data
+    # Central directory
+    yield sink.drain()
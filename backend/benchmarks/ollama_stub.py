@@ -0,0 +1,208 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Reply for the synthetic drawing set, in the structured (response field) key style
+STUB_FIELDS = {
+    "job_name": "Riverside Logistics Center",
+    "job_no": "24-0172",
+    "professional_engineer_name": "Dana M. Ortiz, P.E.",
+    "general_contractor_name": "Brightline Builders Inc",
+    "architect_name": "Hollis & Grant Architects",
+    "engineer_name": "Meridian Structural Engineering",
+    "fabricator_name": "Keystone Steel Fabricators",
+    "design_calculation": None,
+    "contract_drawings": None,
+    "standards": "AISC 360-16, ASTM A992",
+    "detailer": "Northpoint Detailing",
+    "detailing_country": "USA",
+}
+
+# The same reply with the keys the legacy free-form prompt asks for
+LEGACY_KEYS = {
+    "job_name": "Job Name",
+    "job_no": "Job No",
+    "professional_engineer_name": "Professional Engineer Name",
+    "general_contractor_name": "General Contractor Name",
+    "architect_name": "Architect Name",
+    "engineer_name": "Engineer Name",
+    "fabricator_name": "Fabricator Name",
+    "design_calculation": "Design Calculation",
+    "contract_drawings": "Contract Drawings",
+    "standards": "Standards",
+    "detailer": "Detailer",
+    "detailing_country": "Detailing Country",
+}
+
+MODES = ("valid", "malformed", "truncated")
+
+
+def stub_reply(mode: str, structured: bool, fields: list[str] | None = None) -> str:
+    """
+    Model output for a chat request. "malformed" wraps the JSON in prose and a code
+    fence with a trailing comma; "truncated" stops halfway through the object.
+    """
+    values = {field: STUB_FIELDS[field] for field in (fields or STUB_FIELDS)}
+    if not structured:
+        values = {LEGACY_KEYS[field]: value for field, value in values.items()}
+    text = json.dumps(values, indent=2)
+    if mode == "malformed":
+        return "Here is the extracted information:\n```json\n" + text[:-2] + ",\n}\n```\nLet me know if you need more."
+    if mode == "truncated":
+        return text[: len(text) // 2]
+    return text
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_StubServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": model, "model": model} for model in self.server.models]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        request = self._read_json()
+        stub = self.server.stub
+        if self.path == "/api/generate":
+            # Warm-up requests
+            self._send_json({"model": request.get("model"), "response": "", "done": True})
+            return
+        if self.path != "/api/chat":
+            self.send_error(404)
+            return
+
+        stub.requests += 1
+        schema = request.get("format")
+        fields = list(schema["properties"]) if isinstance(schema, dict) and "properties" in schema else None
+        reply = stub_reply(stub.mode, structured=schema is not None, fields=fields)
+        time.sleep(stub.latency)
+        model = request.get("model")
+        counts = {"prompt_eval_count": len(json.dumps(request.get("messages"))) // 4, "eval_count": len(reply) // 4}
+
+        if not request.get("stream", True):
+            self._send_json({
+                "model": model,
+                "message": {"role": "assistant", "content": reply},
+                "done": True,
+                **counts,
+            })
+            return
+
+        # NDJSON stream in small chunks, like a model emitting tokens
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for start in range(0, len(reply), stub.chunk_chars):
+                self._write_chunk({
+                    "model": model,
+                    "message": {"role": "assistant", "content": reply[start:start + stub.chunk_chars]},
+                    "done": False,
+                })
+                if stub.token_latency:
+                    time.sleep(stub.token_latency)
+            self._write_chunk({"model": model, "message": {"role": "assistant", "content": ""}, "done": True, **counts})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled generation by closing the stream
+            pass
+
+    def _write_chunk(self, payload: dict) -> None:
+        line = json.dumps(payload).encode() + b"\n"
+        self.wfile.write(b"%x\r\n" % len(line) + line + b"\r\n")
+        self.wfile.flush()
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    stub: "OllamaStub"
+    models: list[str]
+
+
+class OllamaStub:
+    """
+    Local stand-in for the Ollama HTTP API (/api/tags, /api/generate, /api/chat).
+    latency is slept before each chat reply, token_latency between streamed chunks;
+    mode is one of MODES. Use as a context manager, or call start() and stop().
+    """
+
+    def __init__(
+        self,
+        mode: str = "valid",
+        latency: float = 0.0,
+        token_latency: float = 0.0,
+        chunk_chars: int = 16,
+        models: list[str] | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        self.mode = mode
+        self.latency = latency
+        self.token_latency = token_latency
+        self.chunk_chars = chunk_chars
+        self.requests = 0
+        self._server = _StubServer((host, port), _Handler)
+        self._server.stub = self
+        self._server.models = models or ["stub-model:latest"]
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "OllamaStub":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="ollama-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "OllamaStub":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a local Ollama stand-in")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--mode", choices=MODES, default="valid")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = OllamaStub(args.mode, args.latency, args.token_latency, port=args.port).start()
+    print(f"Ollama stub ({args.mode}) listening on {stub.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
@@ -0,0 +1,253 @@
+"""
+Extraction benchmarks.
+
+Run from the backend directory:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --output new.json --compare results.json --fail-on-regression
+
+Text extraction runs over synthetic drawing sets (see synthetic_pdf.py) and the LLM
+stage against a local Ollama stand-in (see ollama_stub.py), so results only depend
+on the code and the machine. Each benchmark records p50/p99 latency, throughput,
+peak traced memory and the extraction stage timings seen while it ran.
+"""
+import os
+import sys
+import json
+import math
+import time
+import logging
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from typing import Callable
+
+from .ollama_stub import MODES, OllamaStub, stub_reply
+from .synthetic_pdf import make_drawing_set
+
+STUB_MODEL = "stub-model"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def _summary_ms(durations: list[float]) -> dict:
+    return {
+        "p50_ms": round(percentile(durations, 50) * 1000, 3),
+        "p99_ms": round(percentile(durations, 99) * 1000, 3),
+        "mean_ms": round(sum(durations) / len(durations) * 1000, 3),
+    }
+
+
+def measure(fn: Callable, iterations: int, units_per_call: float = 1, unit: str = "calls", warmup: int = 1) -> dict:
+    """
+    Times fn over iterations calls, then runs it once more under tracemalloc for the
+    peak memory (tracing slows allocation-heavy code, so it is kept out of the timings).
+    """
+    from app import metrics
+
+    for _ in range(warmup):
+        fn()
+
+    trace = metrics.Trace()
+    durations = []
+    with trace.activate():
+        for _ in range(iterations):
+            start = time.perf_counter()
+            fn()
+            durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total = sum(durations)
+    return {
+        "iterations": iterations,
+        **_summary_ms(durations),
+        "throughput": round(units_per_call * iterations / total, 3) if total else None,
+        "throughput_unit": f"{unit}/s",
+        "peak_memory_bytes": peak,
+        "stages": {
+            name: {"calls": len(stage_durations), "total_ms": round(sum(stage_durations) * 1000, 3), **_summary_ms(stage_durations)}
+            for name, stage_durations in trace.stages.items()
+        },
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def run_benchmarks(args) -> dict:
+    stub = OllamaStub(latency=args.stub_latency, token_latency=args.stub_token_latency, models=[f"{STUB_MODEL}:latest"]).start()
+    # Point the app at the stub and keep caches and page workers out of the measurements;
+    # set before the app modules read their configuration at import time
+    os.environ["OLLAMA_BASE_URL"] = stub.url
+    os.environ["OLLAMA_MODEL"] = STUB_MODEL
+    os.environ["OLLAMA_FAST_MODEL"] = ""
+    os.environ["EXTRACTION_CACHE_ENABLED"] = "false"
+    # Only the *_parallel benchmarks use the page pool; the others pass workers=1
+    os.environ["PDF_EXTRACTION_WORKERS"] = str(args.workers)
+
+    from app import pdf_extraction as extraction
+
+    results = {}
+    try:
+        documents = {}
+        for pages in args.pages:
+            pdf = make_drawing_set(pages=pages, table_density=args.table_density, seed=pages)
+            documents[pages] = extraction.extract_document_text(pdf, workers=1)
+            results[f"extract_text/{pages}p"] = measure(
+                lambda: extraction.extract_document_text(pdf, workers=1),
+                args.iterations, units_per_call=pages, unit="pages",
+            )
+            results[f"metadata_scan/{pages}p"] = measure(
+                lambda: extraction.extract_document_text(pdf, workers=1, metadata_scan=True),
+                args.iterations, units_per_call=pages, unit="pages",
+            )
+            # Every sheet has its own title block, so the scan never settles
+            unstable = make_drawing_set(pages=pages, table_density=args.table_density, seed=pages, vary_title_block=True)
+            results[f"metadata_scan_unstable/{pages}p"] = measure(
+                lambda: extraction.extract_document_text(unstable, workers=1, metadata_scan=True),
+                args.iterations, units_per_call=pages, unit="pages",
+            )
+            if args.workers > 1 and pages >= extraction.PDF_PARALLEL_MIN_PAGES:
+                results[f"metadata_scan_unstable_parallel/{pages}p"] = measure(
+                    lambda: extraction.extract_document_text(unstable, workers=args.workers, metadata_scan=True),
+                    args.iterations, units_per_call=pages, unit="pages",
+                )
+            results[f"extract_text_compat/{pages}p"] = measure(
+                lambda: extraction.extract_text_from_pdf(pdf, workers=1),
+                args.iterations, units_per_call=pages, unit="pages",
+            )
+
+        largest = documents[max(documents)]
+        full_text = largest.full_text
+        results["extract_with_patterns/text"] = measure(
+            lambda: extraction.extract_with_patterns(full_text),
+            args.fast_iterations, units_per_call=len(full_text), unit="chars",
+        )
+        results["extract_with_patterns/lines"] = measure(
+            lambda: extraction.extract_with_patterns(largest.iter_lines()),
+            args.fast_iterations, units_per_call=len(full_text), unit="chars",
+        )
+
+        for mode in MODES:
+            reply = stub_reply(mode, structured=False)
+            results[f"extract_json_from_text/{mode}"] = measure(
+                lambda: extraction.extract_json_from_text(reply),
+                args.fast_iterations, units_per_call=len(reply), unit="chars",
+            )
+
+        document = documents[min(documents)]
+        for mode in MODES:
+            stub.mode = mode
+            results[f"llm_stage/{mode}"] = measure(
+                lambda: extraction.extract_details_with_ollama(document, STUB_MODEL),
+                args.llm_iterations,
+            )
+    finally:
+        stub.stop()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "pages": args.pages,
+                "table_density": args.table_density,
+                "workers": args.workers,
+                "iterations": args.iterations,
+                "fast_iterations": args.fast_iterations,
+                "llm_iterations": args.llm_iterations,
+                "stub_latency": args.stub_latency,
+                "stub_token_latency": args.stub_token_latency,
+                "ollama_streaming": extraction.OLLAMA_STREAMING,
+                "ollama_structured_output": extraction.OLLAMA_STRUCTURED_OUTPUT,
+            },
+        },
+        "benchmarks": results,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list[str]:
+    """Prints p50/p99 changes per benchmark and returns the names that got slower than tolerance."""
+    regressions = []
+    print(f"{'benchmark':40} {'p50 before':>12} {'p50 after':>12} {'change':>9} {'p99 change':>11}")
+    for name, after in current["benchmarks"].items():
+        before = baseline.get("benchmarks", {}).get(name)
+        if before is None:
+            print(f"{name:40} {'-':>12} {after['p50_ms']:>10.3f}ms {'new':>9}")
+            continue
+        p50_change = (after["p50_ms"] - before["p50_ms"]) / before["p50_ms"] if before["p50_ms"] else 0.0
+        p99_change = (after["p99_ms"] - before["p99_ms"]) / before["p99_ms"] if before["p99_ms"] else 0.0
+        flag = ""
+        if p50_change > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:40} {before['p50_ms']:>10.3f}ms {after['p50_ms']:>10.3f}ms "
+            f"{p50_change:>+8.1%} {p99_change:>+10.1%}{flag}"
+        )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark PDF extraction")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 50], help="page counts of the synthetic drawing sets")
+    parser.add_argument("--table-density", type=float, default=0.5, help="0-1, ruled schedules per page")
+    parser.add_argument("--workers", type=int, default=4, help="page workers for the *_parallel benchmarks")
+    parser.add_argument("--iterations", type=int, default=5, help="runs per text extraction benchmark")
+    parser.add_argument("--fast-iterations", type=int, default=200, help="runs per JSON/pattern benchmark")
+    parser.add_argument("--llm-iterations", type=int, default=10, help="runs per LLM stage benchmark")
+    parser.add_argument("--stub-latency", type=float, default=0.05, help="seconds the stub waits before replying")
+    parser.add_argument("--stub-token-latency", type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--results", help="compare an existing results file instead of running")
+    parser.add_argument("--compare", help="baseline results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="p50 slowdown counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.results:
+        with open(args.results) as f:
+            current = json.load(f)
+    else:
+        current = run_benchmarks(args)
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Wrote {args.output}")
+        for name, result in current["benchmarks"].items():
+            print(
+                f"{name:40} p50 {result['p50_ms']:>10.3f}ms  p99 {result['p99_ms']:>10.3f}ms  "
+                f"{result['throughput']:>12} {result['throughput_unit']:10} peak {result['peak_memory_bytes'] / 1024:>9.0f} KiB"
+            )
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.tolerance)
+        if regressions and args.fail_on_regression:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
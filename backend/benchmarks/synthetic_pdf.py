@@ -0,0 +1,163 @@
+import random
+
+# ARCH D sheet (36" x 24") in PDF points
+SHEET_WIDTH = 2592
+SHEET_HEIGHT = 1728
+
+DEFAULT_TITLE_BLOCK = {
+    "Project Name": "Riverside Logistics Center",
+    "Job No": "24-0172",
+    "Architect": "Hollis & Grant Architects",
+    "Structural Engineer": "Meridian Structural Engineering",
+    "General Contractor": "Brightline Builders Inc",
+    "Fabricator": "Keystone Steel Fabricators",
+    "Professional Engineer": "Dana M. Ortiz, P.E.",
+    "Standards": "AISC 360-16, ASTM A992",
+    "Detailer": "Northpoint Detailing",
+    "Country": "USA",
+}
+
+_NOTE_WORDS = (
+    "steel beam column connection bolt weld plate anchor grout base elevation grid "
+    "framing deck joist girder brace splice camber shim slab footing reinforcement "
+    "shall provide verify field coordinate contractor drawings typical unless noted"
+).split()
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text(x: float, y: float, size: int, text: str) -> str:
+    return f"BT /F1 {size} Tf {x:.1f} {y:.1f} Td ({_escape(text)}) Tj ET"
+
+
+def _rect(x: float, y: float, w: float, h: float) -> str:
+    return f"{x:.1f} {y:.1f} {w:.1f} {h:.1f} re S"
+
+
+def _page_content(
+    page_number: int,
+    page_count: int,
+    title_block: dict | None,
+    table_density: float,
+    notes_lines: int,
+    rng: random.Random,
+    vary_title_block: bool,
+) -> bytes:
+    ops = ["0.5 w", _rect(36, 36, SHEET_WIDTH - 72, SHEET_HEIGHT - 72)]
+
+    # General notes down the left side of the sheet
+    y = SHEET_HEIGHT - 90
+    ops.append(_text(72, y, 14, "GENERAL NOTES"))
+    for i in range(notes_lines):
+        y -= 14
+        words = " ".join(rng.choice(_NOTE_WORDS) for _ in range(rng.randint(8, 16)))
+        ops.append(_text(72, y, 9, f"{i + 1}. {words.upper()}."))
+
+    # Schedules drawn as ruled grids, so pdfplumber's table finder has work to do
+    tables = int(round(table_density * 4))
+    for t in range(tables):
+        rows, cols = 8, 5
+        cell_w, cell_h = 90, 18
+        x0 = 900 + t % 2 * (cols * cell_w + 60)
+        y0 = SHEET_HEIGHT - 200 - t // 2 * (rows * cell_h + 60)
+        for r in range(rows + 1):
+            ops.append(f"{x0:.1f} {y0 - r * cell_h:.1f} m {x0 + cols * cell_w:.1f} {y0 - r * cell_h:.1f} l S")
+        for c in range(cols + 1):
+            ops.append(f"{x0 + c * cell_w:.1f} {y0:.1f} m {x0 + c * cell_w:.1f} {y0 - rows * cell_h:.1f} l S")
+        for r in range(rows):
+            for c in range(cols):
+                cell = "MARK" if r == 0 else f"W{rng.randint(8, 36)}X{rng.randint(10, 150)}"
+                ops.append(_text(x0 + c * cell_w + 4, y0 - (r + 1) * cell_h + 5, 8, cell))
+
+    # Title block in the bottom-right corner, the same on every sheet but the sheet number
+    # unless vary_title_block gives each sheet its own
+    if title_block and vary_title_block:
+        title_block = {label: f"{value} {page_number}" for label, value in title_block.items()}
+    if title_block:
+        tb_x, tb_y = SHEET_WIDTH - 936, 36
+        tb_h = 20 * (len(title_block) + 3)
+        ops.append(_rect(tb_x, tb_y, 900, tb_h))
+        ty = tb_y + tb_h - 24
+        for label, value in title_block.items():
+            ops.append(_text(tb_x + 12, ty, 11, f"{label}: {value}"))
+            ty -= 20
+        ops.append(_text(tb_x + 12, ty, 11, f"Sheet: S-{page_number:03d} of {page_count}"))
+
+    return "\n".join(ops).encode("latin-1")
+
+
+def make_drawing_set(
+    pages: int = 10,
+    title_block: dict | None = DEFAULT_TITLE_BLOCK,
+    table_density: float = 0.5,
+    notes_lines: int = 40,
+    seed: int = 0,
+    vary_title_block: bool = False,
+) -> bytes:
+    """
+    Builds a text-based drawing set PDF without any PDF library.
+    Every page has general notes; title_block (label -> value, None for no title
+    block) is drawn bottom right, with different values on every sheet when
+    vary_title_block is set; table_density (0-1) sets how many ruled schedules
+    each page carries (up to four). The same arguments always give the same bytes.
+    """
+    rng = random.Random(seed)
+    objects: list[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # filled in once the page tree exists
+    page_tree = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    page_ids = []
+    for number in range(1, pages + 1):
+        content = _page_content(number, pages, title_block, table_density, notes_lines, rng, vary_title_block)
+        stream = add(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (page_tree, SHEET_WIDTH, SHEET_HEIGHT, font, stream)
+        ))
+
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[page_tree - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % page_tree
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref_offset)
+    return bytes(out)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a synthetic drawing set PDF")
+    parser.add_argument("output")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--table-density", type=float, default=0.5)
+    parser.add_argument("--no-title-block", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pdf = make_drawing_set(
+        pages=args.pages,
+        title_block=None if args.no_title_block else DEFAULT_TITLE_BLOCK,
+        table_density=args.table_density,
+        seed=args.seed,
+    )
+    with open(args.output, "wb") as f:
+        f.write(pdf)
+    print(f"Wrote {args.output} ({len(pdf)} bytes, {args.pages} pages)")
@@ -0,0 +1,33 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import pdf_extraction
+from app.extraction_jobs import ExtractionJobManager
+from app.schemas import PDFExtractionResponse
+from benchmarks.synthetic_pdf import make_drawing_set
+
+
+def test_stream_on_fresh_manager(monkeypatch):
+    """/stream may be the first request a process serves, before any job has started the manager."""
+    def parse(pdf):
+        return pdf.sha256, None
+
+    def llm(content_hash, document, on_field=None):
+        if on_field:
+            on_field("job_name", "Riverside Logistics Center")
+        return PDFExtractionResponse(job_name="Riverside Logistics Center")
+
+    monkeypatch.setattr(pdf_extraction, "extraction_jobs", ExtractionJobManager(parse, llm))
+    app = FastAPI()
+    app.include_router(pdf_extraction.router)
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/pdf-extraction/stream",
+            files={"file": ("drawing.pdf", make_drawing_set(pages=1), "application/pdf")},
+        )
+
+    assert response.status_code == 200
+    assert "event: field" in response.text
+    assert "event: result" in response.text
+    assert "event: error" not in response.text
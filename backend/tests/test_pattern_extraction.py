@@ -0,0 +1,69 @@
+from app import pdf_extraction
+from app.pdf_extraction import (
+    PATTERN_FAST_PATH_THRESHOLD,
+    build_extraction_response,
+    extract_details_with_ollama,
+    extract_with_patterns_scored,
+    try_pattern_fast_path,
+)
+
+
+class FakeDocument:
+    def __init__(self, lines):
+        self.lines = lines
+
+    def iter_lines(self, region="full"):
+        # No title block found; everything is body text
+        return iter(self.lines if region == "full" else [])
+
+
+def test_labelled_values_keep_their_commas():
+    fields, confidence = extract_with_patterns_scored(
+        "Architect: Pei, Cobb, Freed & Partners\n"
+        "General Contractor: Turner, Smith & Co., Inc.\n"
+        "Standards: AISC 360-16, ASTM A992, AWS D1.1"
+    )
+    assert fields["architect_name"] == "Pei, Cobb, Freed & Partners"
+    assert fields["general_contractor_name"] == "Turner, Smith & Co., Inc"
+    assert fields["standards"] == "AISC 360-16, ASTM A992, AWS D1.1"
+    assert confidence["architect_name"] == 1.0
+
+
+def test_next_label_still_ends_a_value():
+    fields, _ = extract_with_patterns_scored("Job Name: Riverside, Phase 2, Job No: 24-118")
+    assert fields["job_name"] == "Riverside, Phase 2"
+    assert fields["job_no"] == "24-118"
+
+
+def test_value_cut_at_comma_is_not_trusted():
+    fields, confidence = extract_with_patterns_scored("Architect Pei, Cobb, Freed & Partners")
+    assert fields["architect_name"] == "Pei"
+    assert confidence["architect_name"] < PATTERN_FAST_PATH_THRESHOLD
+
+
+def test_fast_path_skips_sheets_with_truncated_firm_names():
+    document = FakeDocument([
+        "Job Name: Riverside Logistics Center",
+        "Job No: 24-118",
+        "General Contractor Turner, Smith & Co., Inc.",
+        "Architect: Pei, Cobb, Freed & Partners",
+    ])
+    assert try_pattern_fast_path(document) is None
+
+    document.lines[2] = "General Contractor: Turner, Smith & Co., Inc."
+    fields = try_pattern_fast_path(document)
+    assert fields["general_contractor_name"] == "Turner, Smith & Co., Inc"
+    assert fields["architect_name"] == "Pei, Cobb, Freed & Partners"
+
+
+def test_fallback_response_is_marked(monkeypatch):
+    """Callers that store results must be able to tell a pattern fallback from the model's answer."""
+    monkeypatch.setattr(type(pdf_extraction.ollama_manager), "available", property(lambda self: False))
+    document = FakeDocument(["Job Name: Riverside Logistics Center"])
+
+    response = build_extraction_response(extract_details_with_ollama(document))
+
+    assert response.pattern_fallback
+    assert response.job_name == "Riverside Logistics Center"
+    assert "pattern_fallback" not in response.model_dump()
+    assert not build_extraction_response({"job_name": "Riverside"}).pattern_fallback
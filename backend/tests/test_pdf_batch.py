@@ -0,0 +1,40 @@
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import pdf_extraction, pdf_ingest
+from app.extraction_jobs import ExtractionJobManager
+from app.pdf_ingest import InflightBytes
+from app.schemas import PDFExtractionResponse
+from benchmarks.synthetic_pdf import make_drawing_set
+
+
+def test_batch_larger_than_inflight_budget(monkeypatch):
+    """Files of one batch queue for the byte budget instead of failing with 503 behind each other."""
+    def parse(pdf):
+        # Holds the budget for longer than a single request would wait for it
+        time.sleep(0.2)
+        return pdf.sha256, None
+
+    def llm(content_hash, document, on_field=None):
+        return PDFExtractionResponse(job_name="Riverside Logistics Center")
+
+    pdfs = [make_drawing_set(pages=pages) for pages in (1, 2, 3, 4, 5)]
+    budget = InflightBytes(max(len(pdf) for pdf in pdfs), wait_seconds=0.05)
+    monkeypatch.setattr(pdf_ingest, "inflight_bytes", budget)
+    monkeypatch.setattr(pdf_extraction, "extraction_jobs", ExtractionJobManager(parse, llm))
+    app = FastAPI()
+    app.include_router(pdf_extraction.router)
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/pdf-extraction/batch",
+            files=[("files", (f"sheet_{i}.pdf", pdf, "application/pdf")) for i, pdf in enumerate(pdfs)],
+        )
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(record["index"] for record in records) == [0, 1, 2, 3, 4]
+    assert all(record["status"] == "completed" for record in records), records
+    assert budget.in_flight == 0
@@ -0,0 +1,34 @@
+import io
+
+import PyPDF2
+from PyPDF2.errors import DependencyError
+
+from app.pdf_preflight import classify_pdf
+from benchmarks.synthetic_pdf import make_drawing_set
+
+
+def _encrypted(user_password: str) -> bytes:
+    writer = PyPDF2.PdfWriter()
+    for page in PyPDF2.PdfReader(io.BytesIO(make_drawing_set(pages=1))).pages:
+        writer.add_page(page)
+    writer.encrypt(user_password=user_password, owner_password="owner")
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def test_user_password_is_encrypted():
+    assert classify_pdf(_encrypted("secret"))["classification"] == "encrypted"
+
+
+def test_owner_password_only_is_read():
+    assert classify_pdf(_encrypted(""))["classification"] == "text"
+
+
+def test_undecryptable_cipher_is_left_to_full_parse(monkeypatch):
+    """AES-256 files raise without a crypto library, though pdfplumber opens them."""
+    def decrypt(self, password):
+        raise DependencyError("PyCryptodome is required for AES algorithm")
+
+    monkeypatch.setattr(PyPDF2.PdfReader, "decrypt", decrypt)
+    assert classify_pdf(_encrypted(""))["classification"] == "unknown"
@@ -0,0 +1,80 @@
+import os
+import time
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import blob_store, upload_sessions, uploads
+from app.db import get_db
+
+
+class FailingInsertSession:
+    """Stands in for the database session; the upload's record can't be inserted."""
+
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    def scalars(self, *args, **kwargs):
+        raise RuntimeError("insert failed")
+
+    def execute(self, *args, **kwargs):
+        return None
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_sessions, "UPLOAD_SESSION_DIR", str(tmp_path / "sessions"))
+    monkeypatch.setattr(blob_store, "BLOB_DIR", str(tmp_path / "blobs"))
+    db = FailingInsertSession()
+    app = FastAPI()
+    app.include_router(uploads.router)
+    app.dependency_overrides[get_db] = lambda: db
+    with TestClient(app, raise_server_exceptions=False) as test_client:
+        test_client.db = db
+        yield test_client
+
+
+def test_finalize_keeps_session_when_insert_fails(client, tmp_path):
+    """A failed insert must leave the assembled data in the session, ready for another finalize."""
+    data = b"%PDF-1.4 resumable upload" * 40
+    created = client.post("/api/uploads/sessions?stage=1", json={"fileName": "sheet.pdf", "size": len(data)})
+    session_id = created.json()["sessionId"]
+    client.put(f"/api/uploads/sessions/{session_id}/chunks/0", content=data)
+
+    response = client.post(f"/api/uploads/sessions/{session_id}/finalize")
+
+    assert response.status_code == 500
+    session_dir = tmp_path / "sessions" / session_id
+    assert (session_dir / "data").read_bytes() == data
+    assert not (session_dir / "finalizing").exists()
+    assert not os.path.exists(tmp_path / "blobs")
+    # Nothing was committed, so no blob reference was taken
+    assert client.db.commits == 0
+    assert client.db.rollbacks == 1
+    # The session can be finalized again once the database is back
+    assert client.get(f"/api/uploads/sessions/{session_id}").json()["missingChunks"] == []
+
+
+def test_sweeper_removes_stale_sessions(client, tmp_path, monkeypatch):
+    """Abandoned sessions go away without anyone starting a new upload."""
+    created = client.post("/api/uploads/sessions?stage=1", json={"fileName": "sheet.pdf", "size": 1000})
+    session_dir = tmp_path / "sessions" / created.json()["sessionId"]
+    stale = time.time() - upload_sessions.UPLOAD_SESSION_TTL_SECONDS - 60
+    os.utime(session_dir / "session.json", (stale, stale))
+
+    async def sweep_once():
+        upload_sessions.start_session_sweeper()
+        await asyncio.sleep(0.5)
+        upload_sessions._sweeper.cancel()
+
+    asyncio.run(sweep_once())
+    assert not session_dir.exists()